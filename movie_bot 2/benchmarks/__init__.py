@@ -0,0 +1,20 @@
+"""
+Offline load-test harness.
+Run from the bot directory: python -m benchmarks.run --help
+
+Importing the package sets placeholder credentials so `config` and
+`database` import without a real Telegram account or MongoDB.
+"""
+import os
+
+for _key, _value in {
+    "API_ID": "1",
+    "API_HASH": "bench",
+    "BOT_TOKEN": "1:bench",
+    "ADMIN_ID": "1",
+    "BACKUP_CHANNEL_ID": "-1001",
+    "STORAGE_BACKEND": "memory",
+    "GPLINKS_API_KEY": "bench",
+    "TMDB_API_KEY": "bench",
+}.items():
+    os.environ.setdefault(_key, _value)
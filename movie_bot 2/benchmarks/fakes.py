@@ -0,0 +1,167 @@
+"""In-process stand-ins for pyrogram's Client/updates and for Database"""
+import asyncio
+import itertools
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pyrogram
+from pyrogram import ContinuePropagation, StopPropagation
+from pyrogram.enums import ChatMemberStatus, ChatType
+from pyrogram.types import CallbackQuery, Message
+
+from database import Database
+from dispatch import update_key, updates
+from storage.memory import MemoryStorage
+
+_ids = itertools.count(1000)
+
+
+# ============ UPDATES ============
+# Subclass the real types (without their __init__) so isinstance checks
+# in pyrogram filters such as filters.regex behave as in production.
+
+class FakeMessage(Message):
+    def __init__(self, client, user_id: int, text: str = None, reply_to_message=None, chat_id: int = None):
+        self._client = client
+        self.id = next(_ids)
+        self.from_user = SimpleNamespace(id=user_id, username=f"user{user_id}", is_bot=False)
+        self.chat = SimpleNamespace(id=chat_id or user_id, type=ChatType.PRIVATE)
+        self.text = text
+        self.caption = None
+        self.command = None
+        self.reply_to_message = reply_to_message
+        self.reply_markup = None
+        self.video = None
+        self.document = None
+        self.photo = None
+
+    async def _reply(self, kind: str, text=None, **kwargs):
+        await self._client.call(kind, chat_id=self.chat.id, text=text, **kwargs)
+        msg = FakeMessage(self._client, self.from_user.id, text, chat_id=self.chat.id)
+        msg.reply_markup = kwargs.get("reply_markup")
+        return msg
+
+    async def reply_text(self, text, **kwargs):
+        return await self._reply("send_message", text, **kwargs)
+
+    async def reply_photo(self, photo, caption=None, **kwargs):
+        msg = await self._reply("send_photo", caption, photo=photo, **kwargs)
+        msg.photo = SimpleNamespace(file_id=photo if not str(photo).startswith("http") else f"PHOTO_{next(_ids)}")
+        return msg
+
+    async def reply_document(self, document, caption=None, **kwargs):
+        return await self._reply("send_document", caption, document=document, **kwargs)
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+        self.reply_markup = kwargs.get("reply_markup")
+        await self._client.call("edit_message_text", chat_id=self.chat.id, text=text, **kwargs)
+        return self
+
+
+class FakeCallbackQuery(CallbackQuery):
+    def __init__(self, client, user_id: int, data: str, message: FakeMessage = None):
+        self._client = client
+        self.id = str(next(_ids))
+        self.from_user = SimpleNamespace(id=user_id, username=f"user{user_id}", is_bot=False)
+        self.data = data
+        self.matches = None
+        self.message = message or FakeMessage(client, user_id)
+
+    async def answer(self, text: str = None, show_alert: bool = None, **kwargs):
+        await self._client.call("answer_callback_query", text=text)
+
+
+# ============ CLIENT ============
+
+class FakeClient(pyrogram.Client):
+    """pyrogram.Client look-alike that dispatches synthetic updates in-process.
+
+    Every outbound Bot API call sleeps `latency` seconds and is counted, so
+    flows can be measured against a simulated Telegram round trip.
+    """
+
+    def __init__(self, latency: float = 0.0, channel_members: set = None):
+        # Deliberately skip Client.__init__: no session, no network
+        self.latency = latency
+        self.channel_members = channel_members
+        self.me = SimpleNamespace(id=1, username="bench_bot", is_bot=True)
+        self.groups = OrderedDict()
+        self.calls = {}
+        self.sent = []      # (kind, kwargs) for the last calls, capped
+
+    # Handler registration (what @app.on_message ends up calling)
+    def add_handler(self, handler, group: int = 0):
+        self.groups.setdefault(group, []).append(handler)
+        self.groups = OrderedDict(sorted(self.groups.items()))
+        return handler, group
+
+    async def dispatch(self, update):
+        """Mirror pyrogram.dispatcher: first matching handler per group"""
+        for handlers in self.groups.values():
+            for handler in handlers:
+                if not isinstance(update, _UPDATE_TYPES[type(handler).__name__]):
+                    continue
+                if not await handler.check(self, update):
+                    continue
+                try:
+                    await handler.callback(self, update)
+                except StopPropagation:
+                    return
+                except ContinuePropagation:
+                    continue
+                break
+        # Handlers return once scheduled; wait for this user's to actually run
+        await updates.settle(update_key(update))
+
+    # Outbound calls
+    async def call(self, kind: str, **kwargs):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        self.sent.append((kind, kwargs))
+        del self.sent[:-1000]
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get_me(self):
+        return self.me
+
+    async def get_chat_member(self, chat_id, user_id):
+        await self.call("get_chat_member")
+        is_member = self.channel_members is None or user_id in self.channel_members
+        status = ChatMemberStatus.MEMBER if is_member else ChatMemberStatus.LEFT
+        return SimpleNamespace(status=status, user=SimpleNamespace(id=user_id))
+
+    async def send_cached_media(self, chat_id, file_id, **kwargs):
+        await self.call("send_cached_media", chat_id=chat_id, file_id=file_id, **kwargs)
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        await self.call("send_media_group", chat_id=chat_id, media=media)
+        return [FakeMessage(self, chat_id) for _ in media]
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self.call("copy_message", chat_id=chat_id)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        await self.call("edit_message_text", chat_id=chat_id, text=text)
+
+    # Convenience constructors
+    def message(self, user_id: int, text: str, **kwargs) -> FakeMessage:
+        return FakeMessage(self, user_id, text, **kwargs)
+
+    def callback(self, user_id: int, data: str) -> FakeCallbackQuery:
+        return FakeCallbackQuery(self, user_id, data)
+
+
+_UPDATE_TYPES = {
+    "MessageHandler": FakeMessage,
+    "CallbackQueryHandler": FakeCallbackQuery,
+    "ChatMemberUpdatedHandler": (),
+    "InlineQueryHandler": (),
+}
+
+
+# ============ DATABASE ============
+
+def make_database(latency: float = 0.0) -> Database:
+    """The real Database (caches, index) over the in-memory backend"""
+    return Database(MemoryStorage(latency=latency))
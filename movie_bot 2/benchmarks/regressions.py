@@ -0,0 +1,37 @@
+"""
+Behaviour checks for cases that once broke; exits non-zero on a failure.
+
+    python -m benchmarks.regressions
+"""
+import benchmarks  # noqa: F401  (sets placeholder env before config loads)
+
+import sys
+
+from search_index import SearchIndex
+
+
+def fuzzy_long_typo_of_short_word():
+    """A query word corrects at its own limit, even past the catalog word's"""
+    index = SearchIndex(max_distance=2)
+    index.load([{"code": "titanic", "title": "Titanic", "parts": 1}])
+    found = [m["code"] for m in index.suggest("tittannic")]
+    assert found == ["titanic"], found
+
+
+CHECKS = [fuzzy_long_typo_of_short_word]
+
+
+def main() -> int:
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"ok    {check.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {check.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
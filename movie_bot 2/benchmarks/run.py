@@ -0,0 +1,130 @@
+"""
+Replay synthetic workloads against the real handlers and write JSON results.
+
+    python -m benchmarks.run --catalog 2000 --updates 500 --output bench.json
+    python -m benchmarks.run --flows search_storm deeplink_flood --tmdb-latency 0.2
+
+Telegram, MongoDB, TMDB and GPLinks are all simulated in-process, each
+with its own configurable latency.
+"""
+import benchmarks  # noqa: F401  (sets placeholder env before config loads)
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import time
+
+import database
+from config import Config
+
+FLOWS = ["search_storm", "deeplink_flood", "multipart_download", "all_parts_download", "broadcast"]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Offline movie bot benchmark")
+    p.add_argument("--flows", nargs="+", choices=FLOWS, default=FLOWS)
+    p.add_argument("--catalog", type=int, default=2000, help="movies in the catalog")
+    p.add_argument("--updates", type=int, default=500, help="users per flow")
+    p.add_argument("--concurrency", type=int, default=100, help="journeys in flight")
+    p.add_argument("--broadcast-users", type=int, default=200)
+    p.add_argument("--broadcast-rate", type=float, default=None, help="msgs/s (default: Config)")
+    p.add_argument("--tg-latency", type=float, default=0.03, help="seconds per Bot API call")
+    p.add_argument("--db-latency", type=float, default=0.002, help="seconds per storage call")
+    p.add_argument("--tmdb-latency", type=float, default=0.08)
+    p.add_argument("--gplinks-latency", type=float, default=0.15)
+    p.add_argument("--output", default="bench_output.json")
+    p.add_argument("--verbose", action="store_true")
+    return p.parse_args()
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def main(args):
+    from benchmarks.fakes import FakeClient, make_database
+    from benchmarks.stubs import StubServer
+    from benchmarks import workloads
+
+    # The in-memory database must be in place before handlers import it
+    fake_db = make_database(latency=args.db_latency)
+    database.db = fake_db
+
+    from handlers import register_all_handlers
+    from http_client import http_client
+    from broadcast import broadcaster
+    from ratelimit import TokenBucket
+    from helpers import movie_info_cache, subscription_flights
+
+    flights = [fake_db.movie_cache.flights, movie_info_cache.flights, subscription_flights]
+
+    movies = workloads.make_catalog(args.catalog)
+    stubs = StubServer(args.tmdb_latency, args.gplinks_latency, workloads.make_tmdb_catalog(movies))
+    base = await stubs.start()
+    Config.TMDB_API_URL = f"{base}/tmdb"
+    Config.GPLINKS_API_URL = f"{base}/gplinks/api"
+    if args.broadcast_rate:
+        broadcaster.bucket = TokenBucket(args.broadcast_rate)
+
+    for m in movies:
+        await fake_db.add_movie(m)
+    await fake_db.load_search_index()
+
+    client = FakeClient(latency=args.tg_latency)
+    register_all_handlers(client)
+
+    results = {}
+    try:
+        for name in args.flows:
+            calls_before = dict(client.calls)
+            hits_before = dict(stubs.hits)
+            coalesced_before = {f.name: f.calls - f.loads for f in flights}
+
+            if name == "broadcast":
+                result = await workloads.broadcast(client, Config.ADMIN_ID, args.broadcast_users)
+            else:
+                flow = getattr(workloads, name)
+                result = await flow(client, movies, args.updates, args.concurrency)
+
+            data = result.to_dict()
+            data["telegram_calls"] = {k: v - calls_before.get(k, 0) for k, v in client.calls.items() if v - calls_before.get(k, 0)}
+            data["upstream_calls"] = {k: v - hits_before.get(k, 0) for k, v in stubs.hits.items()}
+            data["coalesced"] = {f.name: f.calls - f.loads - coalesced_before[f.name] for f in flights}
+            results[name] = data
+            print(
+                f"{name:<20} {data['updates']:>6} updates  {data['throughput']:>8.1f}/s  "
+                f"p50 {data['p50_ms']:>8.2f} ms  p99 {data['p99_ms']:>8.2f} ms  errors {data['errors']}"
+            )
+    finally:
+        await broadcaster.stop()
+        await http_client.close()
+        await stubs.stop()
+
+    report = {
+        "version": git_version(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "flows": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    asyncio.run(main(args))
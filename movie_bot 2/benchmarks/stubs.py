@@ -0,0 +1,43 @@
+"""Local TMDB and GPLinks stand-ins with configurable latency"""
+import asyncio
+from aiohttp import web
+
+
+class StubServer:
+    """One aiohttp server answering both upstream APIs on 127.0.0.1"""
+
+    def __init__(self, tmdb_latency: float = 0.05, gplinks_latency: float = 0.1, catalog: dict = None):
+        self.tmdb_latency = tmdb_latency
+        self.gplinks_latency = gplinks_latency
+        self.catalog = catalog or {}    # normalized title -> TMDB result
+        self.hits = {"tmdb": 0, "gplinks": 0}
+        self.runner = None
+        self.port = None
+
+    async def _tmdb(self, request):
+        self.hits["tmdb"] += 1
+        await asyncio.sleep(self.tmdb_latency)
+        query = request.query.get("query", "").lower()
+        result = self.catalog.get(query)
+        return web.json_response({"results": [result] if result else []})
+
+    async def _gplinks(self, request):
+        self.hits["gplinks"] += 1
+        await asyncio.sleep(self.gplinks_latency)
+        # Echo the long URL back so flows can follow the deep link
+        return web.json_response({"status": "success", "shortenedUrl": request.query.get("url", "")})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/tmdb/search/movie", self._tmdb)
+        app.router.add_get("/gplinks/api", self._gplinks)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
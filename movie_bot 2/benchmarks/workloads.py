@@ -0,0 +1,238 @@
+"""Synthetic workloads driven through the real handlers"""
+import asyncio
+import random
+import time
+
+from helpers import encode_payload, normalize_name
+
+WORDS = [
+    "dune", "interstellar", "avengers", "matrix", "inception", "joker", "tenet",
+    "alien", "gladiator", "titanic", "oppenheimer", "arrival", "parasite",
+    "memento", "whiplash", "coco", "frozen", "batman", "spider", "godzilla"
+]
+
+
+def make_catalog(size: int, multipart_ratio: float = 0.2, seed: int = 7) -> list:
+    """Movie documents shaped like what /add and /addpart produce"""
+    rng = random.Random(seed)
+    movies = []
+    for i in range(size):
+        word = WORDS[i % len(WORDS)]
+        code = f"{word}{i}"
+        parts = rng.randint(2, 6) if rng.random() < multipart_ratio else 1
+        movies.append({
+            "code": code,
+            "title": f"{word.title()} {i}",
+            "file_ids": [f"FILE_{code}_{p}" for p in range(1, parts + 1)],
+            "parts": parts
+        })
+    return movies
+
+
+def make_tmdb_catalog(movies: list) -> dict:
+    return {
+        normalize_name(m["title"]): {
+            "title": m["title"],
+            "release_date": "2021-01-01",
+            "vote_average": 7.5,
+            "overview": "A synthetic movie.",
+            "poster_path": f"/{m['code']}.jpg"
+        }
+        for m in movies
+    }
+
+
+class FlowResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.seconds = 0.0
+        self.extra = {}
+
+    @staticmethod
+    def _pct(ordered: list, q: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.latencies)
+        return {
+            "updates": len(ordered),
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "throughput": round(len(ordered) / self.seconds, 1) if self.seconds else 0.0,
+            "p50_ms": round(self._pct(ordered, 0.50) * 1000, 2),
+            "p99_ms": round(self._pct(ordered, 0.99) * 1000, 2),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            **self.extra
+        }
+
+
+async def _timed(client, update, result: FlowResult):
+    start = time.perf_counter()
+    try:
+        await client.dispatch(update)
+    except Exception:
+        result.errors += 1
+    result.latencies.append(time.perf_counter() - start)
+
+
+async def _run_journeys(name: str, journeys: list, concurrency: int) -> FlowResult:
+    result = FlowResult(name)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def run(journey):
+        async with sem:
+            await journey(result)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(j) for j in journeys))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _user_ids(base: int, n: int) -> range:
+    return range(base, base + n)
+
+
+# ============ FLOWS ============
+
+async def search_storm(client, movies: list, n: int, concurrency: int, seed: int = 1) -> FlowResult:
+    """Plain-text searches: exact titles, prefixes and unknown titles"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        m = rng.choice(movies)
+        roll = rng.random()
+        if roll < 0.7:
+            queries.append(m["title"])
+        elif roll < 0.9:
+            queries.append(m["title"].split()[0][:5])
+        else:
+            queries.append(f"unknown film {rng.randint(0, 10 ** 6)}")
+
+    def journey(user_id, text):
+        async def run(result):
+            await _timed(client, client.message(user_id, text), result)
+        return run
+
+    return await _run_journeys(
+        "search_storm",
+        [journey(u, q) for u, q in zip(_user_ids(100_000, n), queries)],
+        concurrency
+    )
+
+
+async def deeplink_flood(client, movies: list, n: int, concurrency: int) -> FlowResult:
+    """Everyone opens the same channel post deep link at once"""
+    movie = next(m for m in movies if m["parts"] == 1)
+    payload = encode_payload(movie["code"])
+
+    def journey(user_id):
+        async def run(result):
+            await _timed(client, client.message(user_id, f"/start {payload}"), result)
+        return run
+
+    return await _run_journeys(
+        "deeplink_flood",
+        [journey(u) for u in _user_ids(200_000, n)],
+        concurrency
+    )
+
+
+async def multipart_download(client, movies: list, n: int, concurrency: int, seed: int = 2) -> FlowResult:
+    """Deep link -> part button -> tokenized deep link -> file"""
+    rng = random.Random(seed)
+    multipart = [m for m in movies if m["parts"] > 1]
+    delivered = 0
+
+    def journey(user_id, movie):
+        async def run(result):
+            nonlocal delivered
+            await _timed(client, client.message(user_id, f"/start {encode_payload(movie['code'])}"), result)
+
+            part = rng.randint(1, movie["parts"])
+            query = client.callback(user_id, f"part:{movie['code']}:{part}")
+            await _timed(client, query, result)
+
+            markup = query.message.reply_markup
+            if not markup:
+                result.errors += 1
+                return
+            url = markup.inline_keyboard[0][0].url
+            payload = url.split("start=", 1)[1]
+
+            before = client.calls.get("send_cached_media", 0)
+            await _timed(client, client.message(user_id, f"/start {payload}"), result)
+            delivered += client.calls.get("send_cached_media", 0) > before
+        return run
+
+    result = await _run_journeys(
+        "multipart_download",
+        [journey(u, rng.choice(multipart)) for u in _user_ids(300_000, n)],
+        concurrency
+    )
+    result.extra["journeys"] = n
+    result.extra["delivered"] = delivered
+    return result
+
+
+async def all_parts_download(client, movies: list, n: int, concurrency: int, seed: int = 3) -> FlowResult:
+    """Deep link -> "All parts" button -> one tokenized deep link -> albums"""
+    rng = random.Random(seed)
+    multipart = [m for m in movies if m["parts"] > 1]
+    delivered = 0
+
+    def journey(user_id, movie):
+        async def run(result):
+            nonlocal delivered
+            await _timed(client, client.message(user_id, f"/start {encode_payload(movie['code'])}"), result)
+
+            query = client.callback(user_id, f"part:{movie['code']}:0")
+            await _timed(client, query, result)
+
+            markup = query.message.reply_markup
+            if not markup:
+                result.errors += 1
+                return
+            payload = markup.inline_keyboard[0][0].url.split("start=", 1)[1]
+
+            before = client.calls.get("send_media_group", 0) + client.calls.get("send_cached_media", 0)
+            await _timed(client, client.message(user_id, f"/start {payload}"), result)
+            delivered += client.calls.get("send_media_group", 0) + client.calls.get("send_cached_media", 0) > before
+        return run
+
+    result = await _run_journeys(
+        "all_parts_download",
+        [journey(u, rng.choice(multipart)) for u in _user_ids(500_000, n)],
+        concurrency
+    )
+    result.extra["journeys"] = n
+    result.extra["delivered"] = delivered
+    return result
+
+
+async def broadcast(client, admin_id: int, n_users: int) -> FlowResult:
+    """Admin /broadcast to n_users registered users"""
+    from broadcast import broadcaster
+    from database import db
+
+    await db.bulk_upsert_users({u: f"user{u}" for u in _user_ids(400_000, n_users)})
+    result = FlowResult("broadcast")
+
+    source = client.message(admin_id, "📢 Hello!")
+    command = client.message(admin_id, "/broadcast", reply_to_message=source)
+    before = client.calls.get("copy_message", 0)
+
+    start = time.perf_counter()
+    await _timed(client, command, result)
+    if broadcaster.task:
+        await broadcaster.task
+    result.seconds = time.perf_counter() - start
+
+    copied = client.calls.get("copy_message", 0) - before
+    result.extra["messages"] = copied
+    result.extra["messages_per_second"] = round(copied / result.seconds, 1) if result.seconds else 0.0
+    return result
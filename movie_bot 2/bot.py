@@ -3,13 +3,15 @@
 Movie Bot - Main Entry Point
 Run: python bot.py
 """
-import telebot
+import time
+
+_process_start = time.perf_counter()
+
 import asyncio
 import logging
+import signal
 import sys
 
-from movie_bot import bot
-
 # Event loop fix
 try:
     asyncio.get_event_loop()
@@ -17,10 +19,20 @@ except RuntimeError:
     asyncio.set_event_loop(asyncio.new_event_loop())
 
 from pyrogram import Client
-from pyrogram.enums import ParseMode
 from config import Config
 from handlers import register_all_handlers
 from database import db
+from http_client import http_client
+from broadcast import broadcaster
+from importer import importer
+from file_health import file_health
+from jobs import queue, scheduler
+import tasks  # noqa: F401  (registers job tasks and schedules)
+from user_registry import user_registry
+from metrics import start_metrics_server
+from dispatch import updates
+
+_imported = time.perf_counter()
 
 # Logging
 logging.basicConfig(
@@ -31,6 +43,62 @@ logger = logging.getLogger(__name__)
 logging.getLogger("pyrogram").setLevel(logging.WARNING)
 
 
+async def timed(phases: dict, name: str, coro):
+    """Await coro, recording how long it took under phases[name]"""
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        phases[name] = time.perf_counter() - start
+
+
+async def warm_up():
+    """Index and TMDB cache loads are independent - run them side by side"""
+    phases = {}
+    results = await asyncio.gather(
+        timed(phases, "index", db.load_search_index()),
+        timed(phases, "tmdb cache", db.warm_movie_info()),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"❌ Warm-up error: {result}")
+    return phases
+
+
+async def drain(app: Client, deadline: float):
+    """Stop taking updates, let in-flight handlers finish, then disconnect.
+    
+    Dispatcher.stop() queues one sentinel per worker, so updates already
+    queued and handlers already running complete; anything arriving later
+    is left behind. Handlers the scheduler still holds get what is left of
+    the deadline; workers or handlers busy past it are cancelled.
+    """
+    if not app.is_initialized:
+        return
+    dispatcher = app.dispatcher
+    queued = dispatcher.updates_queue.qsize()
+    started = time.monotonic()
+    terminating = asyncio.ensure_future(app.terminate())
+    try:
+        await asyncio.wait_for(asyncio.shield(terminating), deadline)
+        logger.info(f"✅ Drained {queued} queued updates")
+    except asyncio.TimeoutError:
+        busy = [t for t in dispatcher.handler_worker_tasks if not t.done()]
+        logger.warning(f"⚠️ Drain deadline hit, cancelling {len(busy)} handler workers")
+        for task in busy:
+            task.cancel()
+        await asyncio.gather(terminating, *busy, return_exceptions=True)
+        if app.is_initialized:
+            # Nothing left for terminate() to wait on now
+            dispatcher.handler_worker_tasks.clear()
+            await app.terminate()
+    cancelled = await updates.drain(max(deadline - (time.monotonic() - started), 0))
+    if cancelled:
+        logger.warning(f"⚠️ Cancelled {cancelled} scheduled handlers at the drain deadline")
+    await app.disconnect()
+
+
 async def main():
     # Validate config
     try:
@@ -40,12 +108,19 @@ async def main():
         logger.error(f"❌ Config Error: {e}")
         sys.exit(1)
     
+    # SIGTERM/SIGINT start a graceful shutdown
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
     # Create bot
     app = Client(
         name="movie_bot",
         api_id=Config.API_ID,
         api_hash=Config.API_HASH,
-        bot_token=Config.BOT_TOKEN
+        bot_token=Config.BOT_TOKEN,
+        workers=Config.UPDATE_INTAKE_WORKERS
     )
     
     # Register handlers
@@ -53,18 +128,77 @@ async def main():
     logger.info("✅ Handlers registered")
     
     # Start
+    metrics_runner = None
+    failed = False
+    phases = {"imports": _imported - _process_start}
+    main_start = time.perf_counter()
     try:
-        await app.start()
-        me = await app.get_me()
-        logger.info(f"✅ Bot started: @{me.username}")
+        # Telegram login and storage setup (tables, migrations, indexes) in parallel
+        started, storage = await asyncio.gather(
+            timed(phases, "telegram", app.start()),
+            timed(phases, "storage", db.setup()),
+            return_exceptions=True
+        )
+        if isinstance(started, Exception):
+            raise started
+        if isinstance(storage, Exception):
+            # Serving against missing tables or indexes would only fail later
+            raise RuntimeError(f"Storage setup failed: {storage}") from storage
+        logger.info(f"✅ Bot started: @{app.me.username}")
+        
+        # Warm search index and TMDB cache
+        phases.update(await warm_up())
+        
+        # Prometheus endpoint
+        if Config.METRICS_PORT:
+            metrics_runner = await start_metrics_server(Config.METRICS_PORT)
+        
+        # Background writers
+        user_registry.start()
+        
+        # Resume interrupted broadcasts
+        await broadcaster.resume_pending(app)
+        
+        # Keep stored file_ids fresh from their backup channel posts
+        file_health.start(app)
+        
+        # Background jobs, unless a separate `python -m worker` runs them
+        if Config.JOBS_IN_PROCESS:
+            queue.start()
+            scheduler.start()
+        
+        total = time.perf_counter() - _process_start
+        logger.info(
+            f"🚀 Ready in {total:.2f}s (main {time.perf_counter() - main_start:.2f}s) - "
+            + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in phases.items())
+        )
         
         # Keep running
-        await asyncio.Event().wait()
+        await stop.wait()
+        logger.info("🛑 Shutting down...")
         
     except Exception as e:
         logger.error(f"❌ Error: {e}")
+        failed = True
     finally:
-        await app.stop()
+        deadline = time.monotonic() + Config.SHUTDOWN_TIMEOUT
+        # Long-running work checkpoints and resumes on the next start
+        await broadcaster.stop()
+        await importer.stop()
+        await file_health.stop()
+        await scheduler.stop()
+        await queue.stop()
+        await drain(app, max(deadline - time.monotonic(), 0))
+        # Buffered writes last, so users from drained handlers are included
+        await user_registry.stop()
+        await db.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await http_client.close()
+        logger.info("👋 Stopped")
+    
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -74,4 +208,3 @@ if __name__ == "__main__":
 ╚════════════════════════════════╝
     """)
     asyncio.run(main())
-    bot.infinity_polling()
\ No newline at end of file
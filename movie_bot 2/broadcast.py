@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from pyrogram.errors import (
+    FloodWait,
+    InputUserDeactivated,
+    MessageNotModified,
+    PeerIdInvalid,
+    UserIsBlocked
+)
+from config import Config
+from database import db
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+DONE = "done"
+
+
+class BroadcastJob:
+    """State of one broadcast, mirrored to the `broadcasts` collection"""
+
+    def __init__(self, doc: dict):
+        self.id = doc["_id"]
+        self.doc = doc
+        self.resume_event = asyncio.Event()
+        if doc.get("status", RUNNING) == RUNNING:
+            self.resume_event.set()
+        self.cancelled = False
+        self.session_done = 0
+        self.session_started = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.doc["sent"] + self.doc["failed"] + self.doc["blocked"]
+
+
+class BroadcastEngine:
+    """Streams users through a rate-limited worker pool with checkpoints"""
+
+    def __init__(self, workers: int = 10, rate: float = 25, batch_size: int = 200, status_every: float = 5):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.status_every = status_every
+        self.bucket = TokenBucket(rate)
+        self.job = None
+        self.task = None
+
+    @property
+    def busy(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    # Control
+    async def start(self, bot, source, status):
+        """Broadcast `source` (a Message) to every user"""
+        if self.busy:
+            raise RuntimeError("A broadcast is already running")
+
+        doc = {
+            "from_chat_id": source.chat.id,
+            "message_id": source.id,
+            "status_chat_id": status.chat.id,
+            "status_message_id": status.id,
+            "status": RUNNING,
+            "checkpoint": None,
+            "sent": 0,
+            "failed": 0,
+            "blocked": 0,
+            "total": await db.get_user_count(estimated=True),
+            "created_at": time.time()
+        }
+        doc["_id"] = await db.create_broadcast(doc)
+        self._launch(bot, BroadcastJob(doc))
+
+    async def resume_pending(self, bot):
+        """Pick up a broadcast interrupted by a restart"""
+        for doc in await db.get_unfinished_broadcasts():
+            if self.busy:
+                break
+            logger.info(f"Resuming broadcast {doc['_id']} ({doc['status']})")
+            self._launch(bot, BroadcastJob(doc))
+
+    def _launch(self, bot, job: BroadcastJob):
+        self.job = job
+        self.task = asyncio.create_task(self._run(bot, job))
+
+    async def pause(self) -> bool:
+        if not self.busy or not self.job.resume_event.is_set():
+            return False
+        self.job.resume_event.clear()
+        await self._save(self.job, status=PAUSED)
+        return True
+
+    async def resume(self) -> bool:
+        if not self.busy or self.job.resume_event.is_set():
+            return False
+        self.job.resume_event.set()
+        await self._save(self.job, status=RUNNING)
+        return True
+
+    async def cancel(self) -> bool:
+        if not self.busy:
+            return False
+        self.job.cancelled = True
+        self.job.resume_event.set()
+        return True
+
+    async def stop(self):
+        """Stop on shutdown, leaving the checkpoint for the next start"""
+        if self.busy:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    # Engine
+    async def _run(self, bot, job: BroadcastJob):
+        last_status = 0.0
+        batch = []
+        try:
+            async for oid, user_id in db.iter_user_ids(after_id=job.doc["checkpoint"], batch_size=self.batch_size):
+                batch.append((oid, user_id))
+                if len(batch) < self.batch_size:
+                    continue
+                await self._run_batch(bot, job, batch)
+                batch = []
+                if job.cancelled:
+                    break
+                if time.monotonic() - last_status >= self.status_every:
+                    last_status = time.monotonic()
+                    await self._report(bot, job)
+
+            if batch and not job.cancelled:
+                await self._run_batch(bot, job, batch)
+
+            await self._save(job, status=CANCELLED if job.cancelled else DONE)
+            await self._report(bot, job, final=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {job.id} crashed: {e}")
+
+    async def _run_batch(self, bot, job: BroadcastJob, batch: list):
+        pending = iter(batch)
+
+        async def worker():
+            for _, user_id in pending:
+                await job.resume_event.wait()
+                if job.cancelled:
+                    return
+                job.doc[await self._send(bot, job, user_id)] += 1
+                job.session_done += 1
+
+        await asyncio.gather(*(worker() for _ in range(self.workers)))
+        # Only advance the checkpoint past users that were actually attempted
+        if not job.cancelled:
+            job.doc["checkpoint"] = batch[-1][0]
+        await self._save(job)
+
+    async def _send(self, bot, job: BroadcastJob, user_id: int) -> str:
+        while True:
+            await self.bucket.acquire()
+            try:
+                await bot.copy_message(user_id, job.doc["from_chat_id"], job.doc["message_id"])
+                return "sent"
+            except FloodWait as e:
+                logger.warning(f"Broadcast FloodWait: pausing {e.value}s")
+                self.bucket.pause(e.value)
+            except (UserIsBlocked, InputUserDeactivated, PeerIdInvalid):
+                return "blocked"
+            except Exception as e:
+                logger.debug(f"Broadcast to {user_id} failed: {e}")
+                return "failed"
+
+    async def _save(self, job: BroadcastJob, status: str = None):
+        if status:
+            job.doc["status"] = status
+        fields = {k: job.doc[k] for k in ("status", "checkpoint", "sent", "failed", "blocked")}
+        fields["updated_at"] = time.time()
+        await db.update_broadcast(job.id, fields)
+
+    async def _report(self, bot, job: BroadcastJob, final: bool = False):
+        d = job.doc
+        elapsed = time.monotonic() - job.session_started
+        speed = job.session_done / elapsed if elapsed > 0 else 0
+        remaining = max(d["total"] - job.processed, 0)
+
+        if final:
+            head = "🛑 Cancelled" if d["status"] == CANCELLED else "📢 Done!"
+        else:
+            head = "⏸ Paused" if d["status"] == PAUSED else "📢 Broadcasting..."
+
+        text = (
+            f"{head}\n"
+            f"✅ Sent: {d['sent']}\n"
+            f"🚫 Blocked: {d['blocked']}\n"
+            f"❌ Failed: {d['failed']}\n"
+            f"📈 {job.processed}/{d['total']} at {speed:.1f} msg/s"
+        )
+        if not final and speed > 0:
+            text += f"\n⏳ ETA: {int(remaining / speed // 60)}m {int(remaining / speed % 60)}s"
+
+        try:
+            await bot.edit_message_text(d["status_chat_id"], d["status_message_id"], text)
+        except MessageNotModified:
+            pass
+        except Exception as e:
+            logger.warning(f"Broadcast status edit failed: {e}")
+
+
+# Global instance
+broadcaster = BroadcastEngine(
+    workers=Config.BROADCAST_WORKERS,
+    rate=Config.BROADCAST_RATE,
+    batch_size=Config.BROADCAST_BATCH_SIZE
+)
@@ -0,0 +1,237 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+# Refresh-ahead reloads in flight; the loop only keeps weak references to tasks
+_refresh_tasks = set()
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share one in-flight load.
+
+    The load runs as its own task, so a caller that is cancelled doesn't
+    cancel it for the others. Errors reach every waiter and are not kept:
+    the next call after a failure starts a new load.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}      # key -> [task, waiters]
+        self.calls = 0
+        self.loads = 0
+        self.peak_waiters = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    async def do(self, key, func):
+        """Await func() for `key`, joining a load already in flight"""
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            self.loads += 1
+            task = asyncio.get_running_loop().create_task(func())
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(functools.partial(self._landed, key))
+            metrics.inc("singleflight_calls", flight=self.name, role="leader")
+        else:
+            metrics.inc("singleflight_calls", flight=self.name, role="follower")
+
+        flight[1] += 1
+        self.peak_waiters = max(self.peak_waiters, flight[1])
+        metrics.set("singleflight_waiters", sum(f[1] for f in self._flights.values()), flight=self.name)
+        try:
+            return await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+
+    def forget(self, key):
+        """Send later calls for `key` to a new load; current waiters keep theirs"""
+        self._flights.pop(key, None)
+
+    def clear(self):
+        self._flights.clear()
+
+    def is_current(self, key) -> bool:
+        """Inside a load: True unless `key` was forgotten since it started"""
+        flight = self._flights.get(key)
+        return flight is not None and flight[0] is asyncio.current_task()
+
+    def _landed(self, key, task: asyncio.Task):
+        if self._flights.get(key, [None])[0] is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()    # retrieved, even if every waiter gave up
+        metrics.set("singleflight_waiters", sum(f[1] for f in self._flights.values()), flight=self.name)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "loads": self.loads,
+            "coalesced": self.calls - self.loads,
+            "ratio": (self.calls - self.loads) / self.calls if self.calls else 0.0,
+            "in_flight": len(self._flights),
+            "peak_waiters": self.peak_waiters
+        }
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL, negative entries and refresh-ahead.
+
+    Misses for the same key are loaded once, however many callers wait.
+    """
+
+    def __init__(
+        self,
+        name: str = "cache",
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        negative_ttl: float = None,
+        refresh_ahead: float = 0.8,
+        popular_hits: int = 3
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.refresh_ahead = refresh_ahead
+        self.popular_hits = popular_hits
+        self._data = OrderedDict()      # key -> [value, created_at, expires_at, hits]
+        self._refreshing = set()
+        self.flights = SingleFlight(name)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not MISSING
+
+    def get(self, key, default=MISSING, count: bool = True):
+        entry = self._data.get(key)
+        if entry is None or entry[2] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            if count:
+                self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+            entry[3] += 1
+        return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        now = time.monotonic()
+        self._data[key] = [value, now, now + ttl, 0]
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+        self.flights.forget(key)
+
+    def clear(self):
+        self._data.clear()
+        self.flights.clear()
+
+    def resize(self, maxsize: int):
+        self.maxsize = maxsize
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key, loader):
+        """Return the cached value or await loader(key) and cache it.
+
+        Popular entries close to expiry are reloaded in the background so
+        readers keep getting hits. Loader exceptions are not cached.
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            self._maybe_refresh(key, loader)
+            return value
+        return await self.flights.do(key, functools.partial(self._load, key, loader))
+
+    async def _load(self, key, loader):
+        value = await loader(key)
+        # Invalidated while loading: the value may predate the change
+        if self.flights.is_current(key):
+            self.set(key, value)
+        return value
+
+    def _maybe_refresh(self, key, loader):
+        entry = self._data.get(key)
+        if not entry or entry[0] is None or key in self._refreshing:
+            return
+        created, expires, hits = entry[1], entry[2], entry[3]
+        if hits < self.popular_hits:
+            return
+        if time.monotonic() < created + (expires - created) * self.refresh_ahead:
+            return
+
+        async def refresh():
+            try:
+                await self.flights.do(key, functools.partial(self._load, key, loader))
+                self.refreshes += 1
+            except Exception as e:
+                logger.warning(f"Cache refresh failed for {key!r}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(refresh())
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "coalesced": self.flights.calls - self.flights.loads,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+class ReplaySet:
+    """Time-bucketed set of keys that may only be used once before they expire"""
+
+    def __init__(self, bucket_seconds: float = 60):
+        self.bucket_seconds = bucket_seconds
+        self._buckets = {}      # expiry bucket -> keys expiring in it
+
+    def _prune(self, now: float):
+        current = int(now // self.bucket_seconds)
+        for bucket in [b for b in self._buckets if b < current]:
+            del self._buckets[bucket]
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._buckets.values())
+
+    def add(self, key, expires_at: float) -> bool:
+        """Record key until expires_at (wall clock); False if already used"""
+        self._prune(time.time())
+        if any(key in keys for keys in self._buckets.values()):
+            return False
+        # Bucket by expiry so whole buckets drop once every key in them is dead
+        bucket = int(expires_at // self.bucket_seconds) + 1
+        self._buckets.setdefault(bucket, set()).add(key)
+        return True
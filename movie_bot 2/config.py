@@ -15,17 +15,128 @@ class Config:
     # Channel
     BACKUP_CHANNEL_ID = int(os.environ.get("BACKUP_CHANNEL_ID", 0))
     BACKUP_CHANNEL_LINK = os.environ.get("BACKUP_CHANNEL_LINK", "")
+    # Where posters are pre-uploaded to get a file_id (0 = admin's chat)
+    POSTER_CACHE_CHAT = int(os.environ.get("POSTER_CACHE_CHAT", 0))
+    SUB_CACHE_SIZE = int(os.environ.get("SUB_CACHE_SIZE", 50000))
+    SUB_CACHE_TTL = int(os.environ.get("SUB_CACHE_TTL", 600))
+    SUB_CACHE_NEGATIVE_TTL = int(os.environ.get("SUB_CACHE_NEGATIVE_TTL", 30))
     
-    # Database
+    # Flood guard: kind=updates/seconds (kinds: command names, search, callback, default)
+    FLOOD_LIMITS = {
+        kind.strip(): tuple(float(x) for x in limit.split("/", 1))
+        for kind, limit in (
+            item.split("=", 1) for item in os.environ.get(
+                "FLOOD_LIMITS", "start=5/30,search=5/20,callback=10/20,default=20/60"
+            ).split(",") if "=" in item
+        )
+    }
+    
+    # Update scheduling: pyrogram intake workers only hand updates over;
+    # handlers run in lanes (name=slots) under a global limit, in order per user
+    UPDATE_INTAKE_WORKERS = int(os.environ.get("UPDATE_INTAKE_WORKERS", 1))
+    UPDATE_CONCURRENCY = int(os.environ.get("UPDATE_CONCURRENCY", 64))
+    UPDATE_LANES = {
+        lane.strip(): int(size)
+        for lane, size in (
+            item.split("=", 1) for item in os.environ.get(
+                "UPDATE_LANES", "cheap=48,expensive=32"
+            ).split(",") if "=" in item
+        )
+    }
+    
+    # User registry (write-behind)
+    USER_FLUSH_INTERVAL = float(os.environ.get("USER_FLUSH_INTERVAL", 5))
+    USER_FLUSH_MAX = int(os.environ.get("USER_FLUSH_MAX", 1000))
+    
+    # Broadcast (Telegram allows ~30 messages/s per bot)
+    BROADCAST_RATE = float(os.environ.get("BROADCAST_RATE", 25))
+    BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", 10))
+    BROADCAST_BATCH_SIZE = int(os.environ.get("BROADCAST_BATCH_SIZE", 200))
+    
+    # Background jobs (set JOBS_IN_PROCESS=false when running `python -m worker`)
+    JOBS_IN_PROCESS = os.environ.get("JOBS_IN_PROCESS", "true").lower() == "true"
+    JOBS_CONCURRENCY = int(os.environ.get("JOBS_CONCURRENCY", 2))
+    JOBS_LEASE = float(os.environ.get("JOBS_LEASE", 60))
+    JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", 2))
+    TOKEN_CLEANUP_EVERY = int(os.environ.get("TOKEN_CLEANUP_EVERY", 3600))
+    TMDB_REFRESH_CRON = os.environ.get("TMDB_REFRESH_CRON", "30 4 * * *")
+    TMDB_REFRESH_BATCH = int(os.environ.get("TMDB_REFRESH_BATCH", 200))
+    
+    # Shutdown: seconds to drain in-flight updates and flush writes
+    SHUTDOWN_TIMEOUT = float(os.environ.get("SHUTDOWN_TIMEOUT", 15))
+    
+    # Metrics (Prometheus endpoint on localhost; 0 = off)
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+    
+    # Database (mongo | sqlite | memory)
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo").lower()
+    SQLITE_PATH = os.environ.get("SQLITE_PATH", "moviebot.db")
     MONGO_DB_URL = os.environ.get("MONGO_DB_URL", "")
     DB_NAME = os.environ.get("DB_NAME", "MovieBot")
+    MOVIE_CACHE_SIZE = int(os.environ.get("MOVIE_CACHE_SIZE", 500))
+    MOVIE_CACHE_TTL = int(os.environ.get("MOVIE_CACHE_TTL", 60))
+    LIST_PAGE_SIZE = int(os.environ.get("LIST_PAGE_SIZE", 20))
+    
+    # Catalog import (/import): regexes tried in order on the caption's first
+    # line, then the file name. Named groups: title (required), code, part.
+    # Separate patterns with ";;"
+    IMPORT_PATTERNS = [
+        p for p in os.environ.get(
+            "IMPORT_PATTERNS",
+            r"^#(?P<code>\w+)\s+(?P<title>.+?)(?:\s+part\s*(?P<part>\d+))?$"
+            r";;^(?P<title>.+?)[\s._-]+(?:part|pt|cd|ep)[\s._-]*(?P<part>\d{1,3})\b"
+            r";;^(?P<title>.+?)(?:\.(?:mkv|mp4|avi|mov|webm|m4v))?$"
+        ).split(";;") if p.strip()
+    ]
+    IMPORT_BATCH_SIZE = min(int(os.environ.get("IMPORT_BATCH_SIZE", 200)), 200)
+    
+    # Re-read file_ids from their backup channel posts every N seconds (0 = only on failed sends)
+    FILE_SWEEP_INTERVAL = int(os.environ.get("FILE_SWEEP_INTERVAL", 86400))
+    # "All parts" albums: messages/s to one chat once the first album of 10 is out
+    ALBUM_RATE = float(os.environ.get("ALBUM_RATE", 1))
+    
+    # Search (typo tolerance: edits per word, time budget per query)
+    SEARCH_MAX_TYPOS = int(os.environ.get("SEARCH_MAX_TYPOS", 2))
+    SEARCH_FUZZY_BUDGET_MS = float(os.environ.get("SEARCH_FUZZY_BUDGET_MS", 1.0))
+    
+    # Inline mode (enable with /setinline in @BotFather)
+    INLINE_CACHE_TIME = int(os.environ.get("INLINE_CACHE_TIME", 300))
+    INLINE_MAX_RESULTS = int(os.environ.get("INLINE_MAX_RESULTS", 200))
+    
+    # Download tokens
+    TOKEN_TTL = int(os.environ.get("TOKEN_TTL", 600))
+    TOKEN_EXPIRE_AFTER = int(os.environ.get("TOKEN_EXPIRE_AFTER", 3600))
+    TOKEN_MODE = os.environ.get("TOKEN_MODE", "signed").lower()     # signed | mongo
+    TOKEN_SECRET = os.environ.get("TOKEN_SECRET", "")
     
     # GP Links
     GPLINKS_API_KEY = os.environ.get("GPLINKS_API_KEY", "")
     GPLINKS_API_URL = "https://gplinks.com/api"
+    SHORTENER_MAX_IN_FLIGHT = int(os.environ.get("SHORTENER_MAX_IN_FLIGHT", 20))
+    SHORTENER_TIMEOUT = float(os.environ.get("SHORTENER_TIMEOUT", 10))
+    SHORTENER_SLOW_AFTER = float(os.environ.get("SHORTENER_SLOW_AFTER", 5))
+    SHORTENER_FAILURE_THRESHOLD = int(os.environ.get("SHORTENER_FAILURE_THRESHOLD", 5))
+    SHORTENER_RESET_TIMEOUT = float(os.environ.get("SHORTENER_RESET_TIMEOUT", 30))
+    SHORTENER_HEDGE = os.environ.get("SHORTENER_HEDGE", "true").lower() == "true"
+    
+    # Outbound HTTP (pool per upstream host)
+    HTTP_LIMIT_PER_HOST = int(os.environ.get("HTTP_LIMIT_PER_HOST", 20))
+    HTTP_HOST_LIMITS = {
+        host.strip(): int(limit)
+        for host, limit in (
+            item.split("=", 1) for item in os.environ.get("HTTP_HOST_LIMITS", "").split(",") if "=" in item
+        )
+    }
+    HTTP_DNS_TTL = int(os.environ.get("HTTP_DNS_TTL", 300))
+    HTTP_KEEPALIVE = int(os.environ.get("HTTP_KEEPALIVE", 30))
+    HTTP_TIMEOUT = int(os.environ.get("HTTP_TIMEOUT", 15))
     
     # TMDB
     TMDB_API_KEY = os.environ.get("TMDB_API_KEY", "")
+    TMDB_API_URL = os.environ.get("TMDB_API_URL", "https://api.themoviedb.org/3")
+    TMDB_CACHE_SIZE = int(os.environ.get("TMDB_CACHE_SIZE", 2000))
+    TMDB_CACHE_TTL = int(os.environ.get("TMDB_CACHE_TTL", 86400))
+    TMDB_NEGATIVE_TTL = int(os.environ.get("TMDB_NEGATIVE_TTL", 3600))
     
     @classmethod
     def validate(cls):
@@ -34,8 +145,9 @@ class Config:
             ("API_HASH", cls.API_HASH),
             ("BOT_TOKEN", cls.BOT_TOKEN),
             ("ADMIN_ID", cls.ADMIN_ID),
-            ("MONGO_DB_URL", cls.MONGO_DB_URL),
         ]
+        if cls.STORAGE_BACKEND == "mongo":
+            required.append(("MONGO_DB_URL", cls.MONGO_DB_URL))
         missing = [name for name, value in required if not value]
         if missing:
             raise ValueError(f"Missing: {', '.join(missing)}")
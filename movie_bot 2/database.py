@@ -1,28 +1,60 @@
+import copy
 import logging
 import time
-import secrets
-from motor.motor_asyncio import AsyncIOMotorClient
+from cache import TTLCache
 from config import Config
+from helpers import movie_info_cache, normalize_name
+from metrics import metrics
+from search_index import search_index
+from storage import Storage, create_storage
 
 logger = logging.getLogger(__name__)
 
+
+def _set_part(values: list, part: int, value, fill=None) -> list:
+    """Copy of a per-part list with `part` (1-based) set, padded as needed"""
+    values = list(values or [])
+    while len(values) < part:
+        values.append(fill)
+    values[part - 1] = value
+    return values
+
+
+@metrics.instrument("db")
 class Database:
-    def __init__(self):
-        self.client = AsyncIOMotorClient(Config.MONGO_DB_URL)
-        self.db = self.client[Config.DB_NAME]
-        self.movies = self.db["movies"]
-        self.users = self.db["users"]
-        self.tokens = self.db["tokens"]
+    """Caches and the search index in front of the configured storage backend"""
+    
+    def __init__(self, store: Storage = None):
+        # Built on first use so importing this module opens no connections
+        self._store = store
+        
+        # Hot movie documents; the TTL bounds staleness from other processes
+        self.movie_cache = TTLCache(
+            name="movies",
+            maxsize=Config.MOVIE_CACHE_SIZE,
+            ttl=Config.MOVIE_CACHE_TTL
+        )
+    
+    @property
+    def store(self) -> Storage:
+        if self._store is None:
+            self._store = create_storage()
+        return self._store
+    
+    async def setup(self):
+        await self.store.setup()
+    
+    async def close(self):
+        if self._store is not None:
+            await self._store.close()
     
     # Movie operations
     async def add_movie(self, data: dict) -> bool:
         try:
             code = data["code"].lower().strip()
-            await self.movies.update_one(
-                {"code": code},
-                {"$set": data},
-                upsert=True
-            )
+            await self.store.upsert_movie(code, data)
+            self.movie_cache.invalidate(code)
+            search_index.add(code, data.get("title"), data.get("parts"))
             return True
         except Exception as e:
             logger.error(f"Add movie error: {e}")
@@ -31,70 +63,184 @@ class Database:
     async def get_movie(self, code: str) -> dict:
         if not code:
             return None
-        return await self.movies.find_one({"code": code.lower().strip()})
+        movie = await self.movie_cache.get_or_load(code.lower().strip(), self.store.find_movie)
+        # Callers mutate what they get back (e.g. /addpart)
+        return copy.deepcopy(movie)
+    
+    async def get_movies(self, codes: list) -> list:
+        """Uncached documents for many codes at once"""
+        return await self.store.find_movies(codes)
     
     async def search_movies(self, query: str) -> list:
+        """{code, title, parts} summaries, warm index or not; use get_movie for the rest"""
         if not query:
             return []
-        cursor = self.movies.find({
-            "$or": [
-                {"code": {"$regex": query, "$options": "i"}},
-                {"title": {"$regex": query, "$options": "i"}}
-            ]
-        }).limit(10)
-        return await cursor.to_list(length=10)
+        if search_index.ready:
+            return search_index.search(query, limit=10)
+        
+        # Index still cold - fall back to the backend, in the index's shape
+        movies = await self.store.search_movies(query, limit=10)
+        return [{"code": m["code"], "title": m.get("title"), "parts": m.get("parts", 1)} for m in movies]
+    
+    def suggest_movies(self, query: str) -> list:
+        """Typo-tolerant matches for a query with no exact hits"""
+        if not query or not search_index.ready:
+            return []
+        return search_index.suggest(query, limit=10)
+    
+    async def set_movie_info(self, code: str, info: dict):
+        code = code.lower().strip()
+        await self.store.set_movie_info(code, info, time.time())
+        self.movie_cache.invalidate(code)
+    
+    async def set_poster(self, code: str, file_id: str = None, url: str = None):
+        """Remember the Telegram photo uploaded from a poster URL (None forgets it)"""
+        code = code.lower().strip()
+        await self.store.update_movie(code, {"poster_file_id": file_id, "poster_url": url})
+        self.movie_cache.invalidate(code)
+    
+    async def set_file(self, code: str, part: int, file_id: str) -> bool:
+        """Replace one part's file_id, e.g. with a fresh one from its source post"""
+        code = code.lower().strip()
+        movie = await self.store.find_movie(code)
+        if not movie:
+            return False
+        updated = await self.store.update_movie(code, {"file_ids": _set_part(movie.get("file_ids"), part, file_id)})
+        self.movie_cache.invalidate(code)
+        return updated
+    
+    async def record_file_failure(self, code: str, part: int) -> int:
+        """Count a rejected send of one part; returns its failure count"""
+        code = code.lower().strip()
+        movie = await self.store.find_movie(code)
+        if not movie:
+            return 0
+        failures = movie.get("file_failures") or []
+        count = (failures[part - 1] if part <= len(failures) else 0) + 1
+        await self.store.update_movie(code, {"file_failures": _set_part(failures, part, count, fill=0)})
+        self.movie_cache.invalidate(code)
+        return count
+    
+    async def warm_movie_info(self):
+        """Prime the TMDB cache from info persisted on movie documents"""
+        fresh_after = time.time() - Config.TMDB_CACHE_TTL
+        async for title, info in self.store.iter_movie_info(fresh_after):
+            movie_info_cache.set(normalize_name(title), info)
+    
+    async def load_search_index(self):
+        search_index.load(await self.store.movie_summaries())
     
     async def delete_movie(self, code: str) -> bool:
-        result = await self.movies.delete_one({"code": code.lower().strip()})
-        return result.deleted_count > 0
+        code = code.lower().strip()
+        deleted = await self.store.delete_movie(code)
+        self.movie_cache.invalidate(code)
+        search_index.remove(code)
+        return deleted
+    
+    async def import_movies(self, found: dict, dry_run: bool = False) -> tuple:
+        """Merge {code: {"title", "files": {part: file_id}, "sources": {part: msg_id}}} into the catalog.
+        
+        Existing movies keep their title and other parts. One read and one
+        bulk write per call. Returns (new, updated) counts.
+        """
+        existing = {m["code"]: m for m in await self.store.find_movies(list(found))}
+        docs = []
+        for code, item in found.items():
+            movie = existing.get(code) or {"title": item["title"]}
+            file_ids = movie.get("file_ids")
+            source_ids = movie.get("source_ids")
+            for part, file_id in sorted(item["files"].items()):
+                file_ids = _set_part(file_ids, part, file_id)
+                source_ids = _set_part(source_ids, part, item.get("sources", {}).get(part))
+            docs.append({
+                "code": code,
+                "title": movie["title"],
+                "file_ids": file_ids,
+                "source_ids": source_ids,
+                "parts": len([f for f in file_ids if f])
+            })
+        
+        if not dry_run:
+            await self.store.bulk_upsert_movies(docs)
+            for doc in docs:
+                self.movie_cache.invalidate(doc["code"])
+                search_index.add(doc["code"], doc["title"], doc["parts"])
+        return len(found) - len(existing), len(existing)
     
     async def get_all_movies(self) -> list:
-        cursor = self.movies.find({})
-        return await cursor.to_list(length=1000)
+        return await self.store.get_all_movies(limit=1000)
+    
+    async def count_movies(self, exact: bool = False) -> int:
+        return await self.store.count_movies(exact)
+    
+    async def list_movies_page(self, after: str = None, before: str = None, limit: int = 20) -> tuple:
+        return await self.store.list_movies_page(after=after, before=before, limit=limit)
     
     # User operations
     async def add_user(self, user_id: int, username: str = None):
-        await self.users.update_one(
-            {"user_id": user_id},
-            {"$set": {"user_id": user_id, "username": username}},
-            upsert=True
-        )
+        await self.store.upsert_users({user_id: username})
+    
+    async def bulk_upsert_users(self, users: dict):
+        """Upsert {user_id: username} in one unordered batch"""
+        await self.store.upsert_users(users)
     
-    async def get_user_count(self) -> int:
-        return await self.users.count_documents({})
+    async def get_user_count(self, estimated: bool = False) -> int:
+        return await self.store.count_users(estimated)
     
     async def get_all_users(self) -> list:
-        cursor = self.users.find({})
-        return await cursor.to_list(length=100000)
+        return await self.store.get_all_users()
+    
+    async def iter_user_ids(self, after_id=None, batch_size: int = 500):
+        """Yield (checkpoint id, user_id) in a stable order, starting after a checkpoint"""
+        async for item in self.store.iter_user_ids(after_id=after_id, batch_size=batch_size):
+            yield item
+    
+    # Broadcast operations
+    async def create_broadcast(self, data: dict):
+        return await self.store.create_broadcast(data)
+    
+    async def update_broadcast(self, broadcast_id, fields: dict):
+        await self.store.update_broadcast(broadcast_id, fields)
+    
+    async def get_unfinished_broadcasts(self) -> list:
+        return await self.store.get_unfinished_broadcasts()
     
     # Token operations
     async def create_token(self, user_id: int, movie_code: str, part: int = 1) -> str:
-        token = secrets.token_urlsafe(16)
-        await self.tokens.insert_one({
-            "token": token,
-            "user_id": user_id,
-            "movie_code": movie_code,
-            "part": part,
-            "created_at": time.time(),
-            "used": False
-        })
-        return token
+        return await self.store.create_token(user_id, movie_code, part)
     
     async def verify_token(self, token: str, user_id: int) -> dict:
-        ten_min_ago = time.time() - 600
-        return await self.tokens.find_one_and_update(
-            {
-                "token": token,
-                "user_id": user_id,
-                "used": False,
-                "created_at": {"$gte": ten_min_ago}
-            },
-            {"$set": {"used": True}}
-        )
+        return await self.store.verify_token(token, user_id, Config.TOKEN_TTL)
     
     async def cleanup_tokens(self):
-        one_hour_ago = time.time() - 3600
-        await self.tokens.delete_many({"created_at": {"$lt": one_hour_ago}})
+        await self.store.cleanup_tokens(Config.TOKEN_EXPIRE_AFTER)
+    
+    async def stale_movie_codes(self, limit: int = 100) -> list:
+        """Movies whose TMDB info is missing or past TMDB_CACHE_TTL"""
+        return await self.store.stale_movie_codes(time.time() - Config.TMDB_CACHE_TTL, limit)
+    
+    # Background jobs
+    async def create_job(self, doc: dict):
+        return await self.store.create_job(doc)
+    
+    async def claim_job(self, worker: str, now: float, lease: float) -> dict:
+        return await self.store.claim_job(worker, now, lease)
+    
+    async def update_job(self, job_id, fields: dict, worker: str = None) -> bool:
+        return await self.store.update_job(job_id, fields, worker)
+    
+    async def get_job(self, job_id) -> dict:
+        return await self.store.get_job(job_id)
+    
+    async def list_jobs(self, status: str = None, limit: int = 20) -> list:
+        return await self.store.list_jobs(status, limit)
+    
+    # Job state
+    async def get_state(self, key: str) -> dict:
+        return await self.store.get_state(key)
+    
+    async def set_state(self, key: str, value: dict):
+        await self.store.set_state(key, value)
 
 
 # Global instance
@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import logging
+import time
+from config import Config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHEAP = "cheap"
+EXPENSIVE = "expensive"
+
+
+def update_key(update):
+    """Serialization key: the sending user, else the chat"""
+    user = getattr(update, "from_user", None)
+    if user:
+        return user.id
+    chat = getattr(update, "chat", None)
+    return chat.id if chat else None
+
+
+class UpdateScheduler:
+    """Runs handlers as tasks, off pyrogram's dispatcher workers.
+
+    Each update takes, in order: its user's lock (so one user's updates run
+    in arrival order), a slot in its lane (cheap cached replies vs external
+    I/O, so slow calls can't starve quick ones) and a global slot. With a
+    single intake worker pyrogram hands updates over in arrival order and
+    is never blocked by a slow handler.
+    """
+
+    def __init__(self, concurrency: int = 64, lanes: dict = None):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        lanes = lanes or {CHEAP: concurrency, EXPENSIVE: max(concurrency // 2, 1)}
+        self.lanes = {name: asyncio.Semaphore(size) for name, size in lanes.items()}
+        self.sizes = dict(lanes)
+        self.waiting = {name: 0 for name in lanes}
+        self.running = {name: 0 for name in lanes}
+        self.locks = {}         # key -> [lock, users]
+        self.last = {}          # key -> latest task, to wait for a key to settle
+        self.tasks = set()
+
+    # Handler decorators
+    def lane(self, name: str):
+        """Decorator: schedule a pyrogram handler on `name` and return at once"""
+        if name not in self.lanes:
+            raise ValueError(f"Unknown lane: {name}")
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(client, update):
+                self.submit(name, update_key(update), func, client, update)
+            return wrapper
+        return decorator
+
+    @property
+    def cheap(self):
+        return self.lane(CHEAP)
+
+    @property
+    def expensive(self):
+        return self.lane(EXPENSIVE)
+
+    # Scheduling
+    def submit(self, lane: str, key, func, *args) -> asyncio.Task:
+        task = asyncio.create_task(self._run(lane, key, func, args, time.perf_counter()))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        if key is not None:
+            self.last[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        return task
+
+    def _forget(self, key, task: asyncio.Task):
+        if self.last.get(key) is task:
+            del self.last[key]
+
+    def _acquire_lock(self, key) -> asyncio.Lock:
+        entry = self.locks.get(key)
+        if entry is None:
+            entry = self.locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release_lock(self, key):
+        entry = self.locks[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.locks[key]
+
+    def _gauge(self, lane: str):
+        metrics.set("updates_waiting", self.waiting[lane], lane=lane)
+        metrics.set("updates_running", self.running[lane], lane=lane)
+
+    async def _run(self, lane: str, key, func, args: tuple, enqueued: float):
+        self.waiting[lane] += 1
+        self._gauge(lane)
+        started = False
+        lock = self._acquire_lock(key) if key is not None else None
+        try:
+            if lock:
+                await lock.acquire()
+            try:
+                async with self.lanes[lane], self.slots:
+                    self.waiting[lane] -= 1
+                    self.running[lane] += 1
+                    started = True
+                    self._gauge(lane)
+                    metrics.observe("update_wait", time.perf_counter() - enqueued, lane=lane)
+                    try:
+                        await func(*args)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        logger.exception(f"Handler {func.__name__} failed")
+                    finally:
+                        self.running[lane] -= 1
+            finally:
+                if lock:
+                    lock.release()
+        finally:
+            if not started:
+                self.waiting[lane] -= 1
+            if key is not None:
+                self._release_lock(key)
+            self._gauge(lane)
+
+    async def settle(self, key):
+        """Wait until every update submitted so far for `key` has run"""
+        task = self.last.get(key)
+        if task:
+            await asyncio.shield(task)
+
+    async def drain(self, timeout: float) -> int:
+        """Wait for scheduled handlers; cancel what is left after timeout.
+
+        Returns how many were cancelled.
+        """
+        pending = set(self.tasks)
+        if not pending:
+            return 0
+        _, pending = await asyncio.wait(pending, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending)
+
+    def stats(self) -> dict:
+        return {
+            lane: {"size": self.sizes[lane], "running": self.running[lane], "waiting": self.waiting[lane]}
+            for lane in self.lanes
+        }
+
+
+# Global instance
+updates = UpdateScheduler(Config.UPDATE_CONCURRENCY, Config.UPDATE_LANES)
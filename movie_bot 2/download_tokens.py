@@ -0,0 +1,32 @@
+import logging
+from cache import ReplaySet
+from config import Config
+from database import db
+from helpers import is_signed_token, sign_token, verify_signed_token
+
+logger = logging.getLogger(__name__)
+
+# Signatures of redeemed signed tokens, kept until they would expire anyway
+used_tokens = ReplaySet(bucket_seconds=max(Config.TOKEN_TTL // 10, 1))
+
+
+async def create_token(user_id: int, movie_code: str, part: int = 1) -> str:
+    """Issue a single-use download token in the configured mode"""
+    if Config.TOKEN_MODE == "mongo":
+        return await db.create_token(user_id, movie_code, part)
+    return sign_token(movie_code, part, user_id)
+
+
+async def redeem_token(token: str, user_id: int, movie_code: str, part: int = 1) -> dict:
+    """Consume a token; returns {"movie_code", "part"} or None"""
+    if not is_signed_token(token):
+        # Mongo tokens stay redeemable even after switching modes
+        return await db.verify_token(token, user_id)
+    
+    expires = verify_signed_token(token, movie_code, part, user_id)
+    if not expires:
+        return None
+    if not used_tokens.add(token.split(".", 1)[1], expires):
+        logger.info(f"Replayed token from {user_id}")
+        return None
+    return {"movie_code": movie_code, "part": part}
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from pyrogram.enums import ParseMode
+from pyrogram.errors import BadRequest, FloodWait
+from pyrogram.file_id import FileId, FileType
+from pyrogram.types import InputMediaDocument, InputMediaVideo
+from cache import SingleFlight
+from config import Config
+from database import db
+from metrics import metrics
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "file_sweep"
+
+# Telegram's limit on items in one media group
+ALBUM_SIZE = 10
+
+
+def media_file_id(message) -> str:
+    """file_id of a channel post's video or document, or None"""
+    if not message or message.empty:
+        return None
+    media = message.video or message.document
+    return media.file_id if media else None
+
+
+def media_type(file_id: str):
+    """InputMedia class for a stored file_id: videos as videos, the rest as documents"""
+    try:
+        file_type = FileId.decode(file_id).file_type
+    except Exception:
+        return InputMediaDocument
+    return InputMediaVideo if file_type == FileType.VIDEO else InputMediaDocument
+
+
+def albums(files: list) -> list:
+    """Split [(part, file_id)] into runs of one media type, at most ALBUM_SIZE each"""
+    chunks = []
+    for part, file_id in files:
+        kind = media_type(file_id)
+        if not chunks or len(chunks[-1]) == ALBUM_SIZE or chunks[-1][-1][2] is not kind:
+            chunks.append([])
+        chunks[-1].append((part, file_id, kind))
+    return chunks
+
+
+class FileHealth:
+    """Keeps stored file_ids sendable by re-reading their backup channel posts.
+
+    Movies keep the channel message of each part in source_ids, parallel to
+    file_ids. A send Telegram rejects is counted against the file, which is
+    then replaced with the one from its post and sent again. A periodic
+    sweep does the same for the whole catalog, so the normal case stays a
+    single send.
+    """
+
+    def __init__(self, interval: float = 86400, batch_size: int = 200, pause: float = 1.0,
+                 album_rate: float = 1.0):
+        self.interval = interval
+        self.album_rate = album_rate
+        self.batch_size = batch_size
+        self.pause = pause
+        self.flights = SingleFlight("file_heal")
+        self.task = None
+        self.failed = 0
+        self.healed = 0
+        self.lost = 0
+
+    # Delivery
+    async def send(self, bot, chat_id: int, movie: dict, part: int, caption: str) -> bool:
+        """Send one part, healing a rejected file_id once; False if it can't be sent"""
+        file_id = movie["file_ids"][part - 1]
+        try:
+            await self._send(bot, chat_id, file_id, caption)
+            return True
+        except BadRequest as e:
+            logger.warning(f"Send of {movie['code']} part {part} failed: {e}")
+        except Exception as e:
+            logger.error(f"Send of {movie['code']} part {part} failed: {e}")
+            return False
+
+        try:
+            self.failed += 1
+            metrics.inc("file_send_failures")
+            await db.record_file_failure(movie["code"], part)
+            fresh = await self.heal(bot, movie["code"], part)
+            if not fresh or fresh == file_id:
+                return False
+            await self._send(bot, chat_id, fresh, caption)
+            return True
+        except Exception as e:
+            logger.error(f"Healed send of {movie['code']} part {part} failed: {e}")
+            return False
+
+    async def send_all(self, bot, chat_id: int, movie: dict) -> list:
+        """Send every part as media groups, paced for one chat; returns the parts not sent.
+
+        The bucket holds one full album, so the first goes out at once and
+        each later one waits until the chat's message rate allows it. An
+        album Telegram rejects is sent part by part, healing stale files.
+        """
+        files = [(part, file_id) for part, file_id in enumerate(movie.get("file_ids") or [], 1) if file_id]
+        bucket = TokenBucket(self.album_rate, capacity=ALBUM_SIZE)
+        missing = []
+        for chunk in albums(files):
+            await bucket.acquire(len(chunk))
+            if len(chunk) > 1:
+                media = [
+                    kind(file_id, caption=f"🎬 **{movie['title']}** - Part {part}", parse_mode=ParseMode.MARKDOWN)
+                    for part, file_id, kind in chunk
+                ]
+                try:
+                    await self._send_album(bot, chat_id, media, bucket)
+                    metrics.inc("albums_sent")
+                    continue
+                except Exception as e:
+                    logger.warning(f"Album of {movie['code']} failed, sending parts one by one: {e}")
+            for part, _, _ in chunk:
+                if not await self.send(bot, chat_id, movie, part, f"🎬 **{movie['title']}** - Part {part}"):
+                    missing.append(part)
+        return missing
+
+    async def _send_album(self, bot, chat_id: int, media: list, bucket: TokenBucket):
+        while True:
+            try:
+                return await bot.send_media_group(chat_id, media)
+            except FloodWait as e:
+                logger.warning(f"Album FloodWait for {chat_id}: sleeping {e.value}s")
+                bucket.pause(e.value)
+                await asyncio.sleep(e.value)
+
+    async def _send(self, bot, chat_id: int, file_id: str, caption: str):
+        while True:
+            try:
+                return await bot.send_cached_media(
+                    chat_id=chat_id,
+                    file_id=file_id,
+                    caption=caption,
+                    parse_mode=ParseMode.MARKDOWN
+                )
+            except FloodWait as e:
+                logger.warning(f"Send FloodWait for {chat_id}: sleeping {e.value}s")
+                await asyncio.sleep(e.value)
+
+    # Healing
+    async def heal(self, bot, code: str, part: int) -> str:
+        """Fresh file_id for a part from its source post (and store it), or None"""
+        return await self.flights.do((code, part), lambda: self._heal(bot, code, part))
+
+    async def _heal(self, bot, code: str, part: int) -> str:
+        movie = await db.get_movie(code)
+        sources = (movie or {}).get("source_ids") or []
+        source_id = sources[part - 1] if part <= len(sources) else None
+        if not source_id:
+            return None
+
+        posts = await self._fetch(bot, [source_id])
+        file_id = media_file_id(posts.get(source_id))
+        if not file_id:
+            self.lost += 1
+            logger.error(f"Source post {source_id} of {code} part {part} is gone")
+            return None
+        await db.set_file(code, part, file_id)
+        self.healed += 1
+        metrics.inc("file_heals")
+        return file_id
+
+    async def _fetch(self, bot, ids: list) -> dict:
+        while True:
+            try:
+                messages = await bot.get_messages(Config.BACKUP_CHANNEL_ID, ids)
+                return {m.id: m for m in messages if m}
+            except FloodWait as e:
+                logger.warning(f"File sweep FloodWait: sleeping {e.value}s")
+                await asyncio.sleep(e.value)
+
+    # Sweep
+    async def sweep(self, bot) -> dict:
+        """Refresh every file_id that has a source post; returns counts"""
+        checked = refreshed = lost = 0
+        after = None
+        while True:
+            page, has_more = await db.list_movies_page(after=after, limit=self.batch_size)
+            if not page:
+                break
+            after = page[-1]["code"]
+
+            files = []      # (code, part, source_id, file_id)
+            for movie in await db.get_movies([m["code"] for m in page]):
+                file_ids = movie.get("file_ids") or []
+                for part, source_id in enumerate(movie.get("source_ids") or [], 1):
+                    if source_id and part <= len(file_ids):
+                        files.append((movie["code"], part, source_id, file_ids[part - 1]))
+
+            for i in range(0, len(files), 200):
+                chunk = files[i:i + 200]
+                posts = await self._fetch(bot, [f[2] for f in chunk])
+                for code, part, source_id, file_id in chunk:
+                    fresh = media_file_id(posts.get(source_id))
+                    if not fresh:
+                        lost += 1
+                        logger.warning(f"Source post {source_id} of {code} part {part} is gone")
+                    elif fresh != file_id:
+                        await db.set_file(code, part, fresh)
+                        refreshed += 1
+                checked += len(chunk)
+                await asyncio.sleep(self.pause)
+
+            if not has_more:
+                break
+
+        self.healed += refreshed
+        self.lost += lost
+        logger.info(f"File sweep: {checked} checked, {refreshed} refreshed, {lost} lost")
+        return {"checked": checked, "refreshed": refreshed, "lost": lost}
+
+    async def _loop(self, bot):
+        while True:
+            try:
+                state = await db.get_state(STATE_KEY)
+                if state is None:
+                    # First start: count from now rather than sweeping at once
+                    await db.set_state(STATE_KEY, {"last_run": time.time()})
+                    continue
+                wait = state["last_run"] + self.interval - time.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                result = await self.sweep(bot)
+                await db.set_state(STATE_KEY, {"last_run": time.time(), **result})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"File sweep error: {e}")
+                await asyncio.sleep(60)
+
+    def start(self, bot):
+        if self.task is None and self.interval and Config.BACKUP_CHANNEL_ID:
+            self.task = asyncio.create_task(self._loop(bot))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def stats(self) -> dict:
+        return {"failed": self.failed, "healed": self.healed, "lost": self.lost}
+
+
+# Global instance
+file_health = FileHealth(interval=Config.FILE_SWEEP_INTERVAL, album_rate=Config.ALBUM_RATE)
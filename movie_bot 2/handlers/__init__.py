@@ -1,9 +1,15 @@
+from handlers.guard import register_guard_handlers
 from handlers.admin import register_admin_handlers
 from handlers.user import register_user_handlers
 from handlers.callbacks import register_callback_handlers
+from handlers.members import register_member_handlers
+from handlers.inline import register_inline_handlers
 
 def register_all_handlers(app):
     """Register all handlers"""
+    register_guard_handlers(app)
     register_admin_handlers(app)
     register_user_handlers(app)
-    register_callback_handlers(app)
\ No newline at end of file
+    register_callback_handlers(app)
+    register_member_handlers(app)
+    register_inline_handlers(app)
\ No newline at end of file
@@ -1,25 +1,45 @@
 if __name__ == "__main__":
     exit("Run bot.py instead!")
 
+import asyncio
+import json
 import logging
+import time
 from pyrogram import Client, filters
 from pyrogram.enums import ParseMode
-from pyrogram.types import Message
+from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from config import Config
+from dispatch import updates
+from metrics import metrics
 from database import db
-from helpers import normalize_name, check_subscription
+from helpers import code_fits, normalize_name, check_subscription, movie_info_cache, subscription_cache, subscription_flights
+from shortener import shortener
+from broadcast import broadcaster
+from importer import importer
+from file_health import file_health
+from jobs import queue
+from user_registry import user_registry
+from schema import SchemaManager
+from handlers.guard import flood_guard
+from handlers.user import preload_poster
 
 logger = logging.getLogger(__name__)
 
+# Fire-and-forget work (poster preloads); the loop only keeps weak references
+background_tasks = set()
+
 
 def register_admin_handlers(app: Client):
     
     @app.on_message(filters.command("add") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
     async def add_movie(bot: Client, message: Message):
         if not message.reply_to_message:
             await message.reply_text(
                 "📥 **How to add movie:**\n\n"
-                "1. Send/forward a video file\n"
+                "1. Forward a video from the backup channel\n"
+                "   (or send one; only forwards can be re-fetched if the file goes stale)\n"
                 "2. Reply to it with:\n"
                 "`/add moviecode Movie Title`\n\n"
                 "Example: `/add dune Dune 2021`",
@@ -45,14 +65,23 @@ def register_admin_handlers(app: Client):
             return
         
         code = normalize_name(args[1])
+        if not code_fits(code):
+            await message.reply_text("❌ Code too long! Keep it under 40 characters.")
+            return
         title = args[2] if len(args) > 2 else code.replace("_", " ").title()
         
         await db.add_movie({
             "code": code,
             "title": title,
             "file_ids": [file_id],
+            "source_ids": [source_post_id(replied)],
+            "file_failures": [],
             "parts": 1
         })
+        # Fetch TMDB info and upload the poster now, not on the first user's card
+        task = asyncio.create_task(preload_poster(bot, code))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
         
         await message.reply_text(
             f"✅ **Movie Added!**\n\n"
@@ -63,6 +92,8 @@ def register_admin_handlers(app: Client):
     
     
     @app.on_message(filters.command("addpart") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
     async def add_part(bot: Client, message: Message):
         if not message.reply_to_message:
             await message.reply_text(
@@ -98,11 +129,16 @@ def register_admin_handlers(app: Client):
             return
         
         file_ids = movie.get("file_ids", [])
+        source_ids = movie.get("source_ids") or []
         while len(file_ids) < part_num:
             file_ids.append(None)
+        while len(source_ids) < part_num:
+            source_ids.append(None)
         file_ids[part_num - 1] = file_id
+        source_ids[part_num - 1] = source_post_id(replied)
         
         movie["file_ids"] = file_ids
+        movie["source_ids"] = source_ids
         movie["parts"] = len([f for f in file_ids if f])
         await db.add_movie(movie)
         
@@ -115,6 +151,8 @@ def register_admin_handlers(app: Client):
     
     
     @app.on_message(filters.command("delete") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
     async def delete_movie(bot: Client, message: Message):
         args = message.text.split(None, 1)
         if len(args) < 2:
@@ -129,61 +167,358 @@ def register_admin_handlers(app: Client):
     
     
     @app.on_message(filters.command("list") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
     async def list_movies(bot: Client, message: Message):
-        movies = await db.get_all_movies()
+        movies, has_next = await db.list_movies_page(limit=Config.LIST_PAGE_SIZE)
         if not movies:
             await message.reply_text("📭 No movies yet!")
             return
         
-        text = "📽️ **Movies:**\n\n"
-        for i, m in enumerate(movies[:50], 1):
-            text += f"{i}. `{m['code']}` - {m['title']} ({m.get('parts', 1)}p)\n"
+        text, kb = render_movie_page(movies, 1, has_prev=False, has_next=has_next)
+        await message.reply_text(text, reply_markup=kb, parse_mode=ParseMode.MARKDOWN)
+    
+    
+    @app.on_callback_query(filters.regex(r"^list:") & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def list_page_cb(bot: Client, query: CallbackQuery):
+        # list:<n|p>:<page>:<code> - keyset cursor, one page per press
+        _, direction, page, code = query.data.split(":", 3)
+        page = int(page)
         
-        await message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+        if direction == "n":
+            movies, has_next = await db.list_movies_page(after=code, limit=Config.LIST_PAGE_SIZE)
+            has_prev = page > 1
+        else:
+            movies, has_prev = await db.list_movies_page(before=code, limit=Config.LIST_PAGE_SIZE)
+            has_next = True
+        
+        if not movies:
+            await query.answer("📭 No more movies!")
+            return
+        
+        text, kb = render_movie_page(movies, page, has_prev=has_prev, has_next=has_next)
+        await query.message.edit_text(text, reply_markup=kb, parse_mode=ParseMode.MARKDOWN)
+        await query.answer()
     
     
     @app.on_message(filters.command("stats") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
     async def stats(bot: Client, message: Message):
-        users = await db.get_user_count()
-        movies = await db.get_all_movies()
+        users = await db.get_user_count(estimated=True)
+        movies = await db.count_movies()
+        tmdb = movie_info_cache.stats()
+        short = shortener.stats()
+        reg = user_registry.stats()
+        mc = db.movie_cache.stats()
+        files = file_health.stats()
+        lanes = " | ".join(
+            f"{name} {s['running']}/{s['size']} (+{s['waiting']})" for name, s in updates.stats().items()
+        )
         
         await message.reply_text(
             f"📊 **Stats**\n\n"
             f"👥 Users: {users}\n"
-            f"🎬 Movies: {len(movies)}",
+            f"🎬 Movies: {movies}\n\n"
+            f"📝 User writes: {reg['flushed']} flushed | {reg['pending']} pending | {reg['skipped']} skipped\n\n"
+            f"🎞 Movie cache: {mc['size']}/{mc['maxsize']} | hit rate {mc['hit_rate']:.0%}\n"
+            f"Hits: {mc['hits']} | Misses: {mc['misses']} | Evicted: {mc['evictions']} | Coalesced: {mc['coalesced']}\n\n"
+            f"🗂 TMDB cache: {tmdb['size']}/{tmdb['maxsize']}\n"
+            f"Hits: {tmdb['hits']} | Misses: {tmdb['misses']} | Evicted: {tmdb['evictions']} | Coalesced: {tmdb['coalesced']}\n\n"
+            f"🔗 Shortener: {short['state']} | p95 {short['p95_ms'] or '-'} ms\n"
+            f"Calls: {short['calls']} | Fallbacks: {short['fallbacks']} | Hedged: {short['hedged']}\n\n"
+            f"🛡 Flood guard: {flood_guard.dropped} dropped | {len(flood_guard.buckets)} buckets\n"
+            f"🩹 Files: {files['failed']} failed sends | {files['healed']} refreshed | {files['lost']} lost\n"
+            f"🚦 Lanes: {lanes}",
             parse_mode=ParseMode.MARKDOWN
         )
     
     
+    @app.on_message(filters.command("metrics") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def metrics_cmd(bot: Client, message: Message):
+        rows = metrics.summary()
+        if not rows:
+            await message.reply_text("📭 No metrics yet!")
+            return
+        
+        text = "📈 **Latency** (count | p50 / p95 / p99 ms)\n"
+        section = None
+        for name, labels, count, p50, p95, p99 in rows:
+            if name != section:
+                section = name
+                text += f"\n**{name}**\n"
+            label = " ".join(str(v) for v in labels.values())
+            text += f"`{label}`: {count} | {p50 * 1000:.0f} / {p95 * 1000:.0f} / {p99 * 1000:.0f}\n"
+        
+        # Telegram caps messages at 4096 chars; split between lines so no entity is cut
+        for chunk in split_lines(text):
+            await message.reply_text(chunk, parse_mode=ParseMode.MARKDOWN)
+    
+    
+    @app.on_message(filters.command("dbstats") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def dbstats(bot: Client, message: Message):
+        if db.store.name != "mongo":
+            await message.reply_text(f"❌ Index stats need MongoDB (backend: {db.store.name})")
+            return
+        
+        schema = SchemaManager(db.store)
+        try:
+            usage = await schema.index_usage()
+            plans = await schema.explain_hot_queries()
+            version = await schema.get_version()
+        except Exception as e:
+            await message.reply_text(f"❌ Error: {e}")
+            return
+        
+        text = f"🗄 **DB Stats** (schema v{version})\n\n**Index usage:**\n"
+        for coll, indexes in usage.items():
+            text += f"`{coll}`: " + ", ".join(f"{name}={ops}" for name, ops in indexes) + "\n"
+        
+        text += "\n**Hot queries:**\n"
+        for name, plan in plans.items():
+            text += f"`{name}`: {plan['stages']} | docs {plan['docs_examined']} | {plan['millis']} ms\n"
+        
+        await message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+    
+    
     @app.on_message(filters.command("broadcast") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
     async def broadcast(bot: Client, message: Message):
         if not message.reply_to_message:
             await message.reply_text("❌ Reply to a message to broadcast!")
             return
         
-        users = await db.get_all_users()
-        sent, failed = 0, 0
+        if broadcaster.busy:
+            await message.reply_text("❌ A broadcast is already running! Use /bcancel first.")
+            return
         
         status = await message.reply_text("📢 Broadcasting...")
+        await broadcaster.start(bot, message.reply_to_message, status)
+    
+    
+    @app.on_message(filters.command(["bpause", "bresume", "bcancel"]) & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def broadcast_control(bot: Client, message: Message):
+        command = message.command[0]
+        
+        if command == "bpause":
+            ok = await broadcaster.pause()
+            text = "⏸ Broadcast paused." if ok else "❌ No running broadcast!"
+        elif command == "bresume":
+            ok = await broadcaster.resume()
+            text = "▶️ Broadcast resumed." if ok else "❌ No paused broadcast!"
+        else:
+            ok = await broadcaster.cancel()
+            text = "🛑 Cancelling broadcast..." if ok else "❌ No broadcast to cancel!"
+        
+        await message.reply_text(text)
+    
+    
+    @app.on_message(filters.command("import") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def import_cmd(bot: Client, message: Message):
+        args = message.text.split()[1:]
+        
+        if args and args[0] == "cancel":
+            text = "🛑 Cancelling import..." if importer.cancel() else "❌ No import running!"
+            await message.reply_text(text)
+            return
+        
+        if importer.busy:
+            await message.reply_text("❌ An import is already running! Use `/import cancel` first.", parse_mode=ParseMode.MARKDOWN)
+            return
+        
+        if args and args[0] == "resume":
+            status = await message.reply_text("📥 Resuming import...")
+            if not await importer.resume(bot, status):
+                await status.edit_text("❌ Nothing to resume!")
+            return
+        
+        dry_run = "dry" in args
+        ids = [a for a in args if a != "dry"]
+        if not all(a.isdigit() for a in ids) or len(ids) > 2:
+            await message.reply_text(
+                "📥 **Import from the backup channel:**\n\n"
+                "`/import` - whole channel\n"
+                "`/import 100 5000` - message id range\n"
+                "`/import 100 5000 dry` - preview only\n"
+                "`/import resume` - continue after a stop\n"
+                "`/import cancel`",
+                parse_mode=ParseMode.MARKDOWN
+            )
+            return
+        
+        from_id = int(ids[0]) if ids else 1
+        to_id = int(ids[1]) if len(ids) > 1 else None
+        status = await message.reply_text("🧪 Dry run..." if dry_run else "📥 Importing...")
+        await importer.start(bot, status, from_id=from_id, to_id=to_id, dry_run=dry_run)
+    
+    
+    @app.on_message(filters.command("jobs") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def jobs_cmd(bot: Client, message: Message):
+        args = message.text.split()
+        status = args[1] if len(args) > 1 else None
+        jobs = await db.list_jobs(status=status, limit=20)
+        
+        if not jobs:
+            await message.reply_text("📭 No jobs!")
+            return
+        
+        icons = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌", "cancelled": "🛑"}
+        lines = [
+            f"{icons.get(j['status'], '•')} `{j['id']}` {j['task']} "
+            f"({j.get('attempts', 0)}/{j.get('max_attempts', 0)})"
+            for j in jobs
+        ]
+        await message.reply_text(
+            f"🗂 **Jobs{' - ' + status if status else ''}:**\n\n" + "\n".join(lines) +
+            "\n\n`/job id` `/jobcancel id` `/jobrun task`",
+            parse_mode=ParseMode.MARKDOWN
+        )
+    
+    
+    @app.on_message(filters.command("job") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def job_cmd(bot: Client, message: Message):
+        args = message.text.split()
+        job = await db.get_job(args[1]) if len(args) > 1 else None
+        if not job:
+            await message.reply_text("❌ Usage: `/job id` (see /jobs)", parse_mode=ParseMode.MARKDOWN)
+            return
+        
+        def ago(ts):
+            return f"{int(time.time() - ts)}s ago" if ts else "-"
+        
+        text = (
+            f"🗂 **Job** `{job['id']}`\n\n"
+            f"Task: {job['task']}\n"
+            f"Status: {job['status']}\n"
+            f"Priority: {job.get('priority', 0)}\n"
+            f"Attempts: {job.get('attempts', 0)}/{job.get('max_attempts', 0)}\n"
+            f"Created: {ago(job.get('created_at'))}\n"
+            f"Started: {ago(job.get('started_at'))}\n"
+            f"Finished: {ago(job.get('finished_at'))}\n"
+            f"Worker: {job.get('worker', '-')}\n"
+            f"Payload: `{json.dumps(job.get('payload', {}))[:300]}`"
+        )
+        if job.get("result") is not None:
+            text += f"\nResult: `{json.dumps(job['result'])[:300]}`"
+        if job.get("error"):
+            text += f"\nError: `{job['error'][:300]}`"
+        await message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+    
+    
+    @app.on_message(filters.command(["jobcancel", "jobrun"]) & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def job_control(bot: Client, message: Message):
+        args = message.text.split()
+        if len(args) < 2:
+            await message.reply_text(
+                f"❌ Usage: `/{message.command[0]} {'id' if message.command[0] == 'jobcancel' else 'task'}`",
+                parse_mode=ParseMode.MARKDOWN
+            )
+            return
         
-        for user in users:
-            try:
-                await message.reply_to_message.copy(user["user_id"])
-                sent += 1
-            except:
-                failed += 1
+        if message.command[0] == "jobcancel":
+            ok = await queue.cancel(args[1])
+            await message.reply_text("🛑 Job cancelled." if ok else "❌ No queued or running job with that id!")
+            return
         
-        await status.edit_text(f"📢 Done!\n✅ Sent: {sent}\n❌ Failed: {failed}")
+        if args[1] not in queue.tasks:
+            await message.reply_text(f"❌ Tasks: {', '.join(sorted(queue.tasks))}")
+            return
+        job_id = await queue.enqueue(args[1], priority=1, unique_key=f"manual:{args[1]}")
+        if job_id is None:
+            await message.reply_text("⏳ Already queued or running!")
+        else:
+            await message.reply_text(f"✅ Queued `{job_id}`", parse_mode=ParseMode.MARKDOWN)
     
     
     @app.on_message(filters.command("checksub") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.expensive
+    @metrics.handler
     async def checksub(bot: Client, message: Message):
         user_id = message.from_user.id
-        is_sub = await check_subscription(bot, user_id)
+        is_sub = await check_subscription(bot, user_id, use_cache=False)
         
         await message.reply_text(
             f"🔍 **Debug Info**\n\n"
             f"Channel ID: `{Config.BACKUP_CHANNEL_ID}`\n"
             f"Your Status: {'✅ Subscribed' if is_sub else '❌ Not Subscribed'}",
             parse_mode=ParseMode.MARKDOWN
-        )
\ No newline at end of file
+        )
+    
+    
+    @app.on_message(filters.command("subcache") & filters.private & filters.user(Config.ADMIN_ID))
+    @updates.cheap
+    @metrics.handler
+    async def subcache(bot: Client, message: Message):
+        args = message.text.split()
+        
+        if len(args) > 1:
+            if args[1] == "clear":
+                subscription_cache.clear()
+            elif args[1].isdigit() and int(args[1]) > 0:
+                subscription_cache.resize(int(args[1]))
+            else:
+                await message.reply_text("❌ Usage: `/subcache [size|clear]`", parse_mode=ParseMode.MARKDOWN)
+                return
+        
+        s = subscription_cache.stats()
+        f = subscription_flights.stats()
+        await message.reply_text(
+            f"👥 **Subscription Cache**\n\n"
+            f"Size: {s['size']}/{s['maxsize']}\n"
+            f"Hits: {s['hits']} | Misses: {s['misses']} | Evicted: {s['evictions']}\n"
+            f"Hit rate: {s['hit_rate']:.0%}\n"
+            f"Lookups: {f['loads']} | Coalesced: {f['coalesced']} ({f['ratio']:.0%})",
+            parse_mode=ParseMode.MARKDOWN
+        )
+
+
+# ============ HELPER FUNCTIONS ============
+
+def split_lines(text: str, limit: int = 4000) -> list:
+    """Split text into messages of at most `limit` chars, only at line breaks"""
+    chunks = [""]
+    for line in text.splitlines(keepends=True):
+        if chunks[-1] and len(chunks[-1]) + len(line) > limit:
+            chunks.append("")
+        chunks[-1] += line
+    return chunks
+
+
+def source_post_id(message: Message) -> int:
+    """Backup channel message id of a post forwarded from there, else None"""
+    chat = message.forward_from_chat
+    if chat and chat.id == Config.BACKUP_CHANNEL_ID:
+        return message.forward_from_message_id
+    return None
+
+
+def render_movie_page(movies: list, page: int, has_prev: bool, has_next: bool) -> tuple:
+    start = (page - 1) * Config.LIST_PAGE_SIZE
+    text = f"📽️ **Movies** (page {page}):\n\n"
+    for i, m in enumerate(movies, start + 1):
+        text += f"{i}. `{m['code']}` - {m['title']} ({m.get('parts', 1)}p)\n"
+    
+    nav = []
+    if has_prev:
+        nav.append(InlineKeyboardButton("◀️ Prev", callback_data=f"list:p:{page - 1}:{movies[0]['code']}"))
+    if has_next:
+        nav.append(InlineKeyboardButton("Next ▶️", callback_data=f"list:n:{page + 1}:{movies[-1]['code']}"))
+    
+    return text, InlineKeyboardMarkup([nav]) if nav else None
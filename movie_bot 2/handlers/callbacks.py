@@ -6,8 +6,12 @@ from pyrogram import Client, filters
 from pyrogram.enums import ParseMode
 from pyrogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from config import Config
+from dispatch import updates
+from metrics import metrics
 from database import db
-from helpers import check_subscription, get_short_link, encode_payload, get_movie_info
+from download_tokens import create_token
+from helpers import check_subscription, get_short_link, encode_payload
+from handlers.user import ALL_PARTS, get_card_info, parts_keyboard
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +19,8 @@ logger = logging.getLogger(__name__)
 def register_callback_handlers(app: Client):
     
     @app.on_callback_query(filters.regex(r"^movie:"))
+    @updates.expensive
+    @metrics.handler
     async def movie_cb(bot: Client, query: CallbackQuery):
         code = query.data.split(":")[1]
         movie = await db.get_movie(code)
@@ -23,7 +29,7 @@ def register_callback_handlers(app: Client):
             await query.answer("❌ Not found!", show_alert=True)
             return
         
-        info = await get_movie_info(movie["title"])
+        info = await get_card_info(movie)
         parts = f"\n📦 Parts: {movie['parts']}" if movie.get('parts', 1) > 1 else ""
         
         if info:
@@ -41,6 +47,8 @@ def register_callback_handlers(app: Client):
     
     
     @app.on_callback_query(filters.regex(r"^part:"))
+    @updates.expensive
+    @metrics.handler
     async def part_cb(bot: Client, query: CallbackQuery):
         user_id = query.from_user.id
         _, code, part = query.data.split(":")
@@ -55,16 +63,17 @@ def register_callback_handlers(app: Client):
             await query.answer("❌ Not found!", show_alert=True)
             return
         
-        token = await db.create_token(user_id, code, part)
+        token = await create_token(user_id, code, part)
         payload = encode_payload(code, part, token)
         final_link = f"https://t.me/{bot.me.username}?start={payload}"
         
         await query.answer("🔄 Generating...")
         
         short = await get_short_link(final_link)
+        label = f"All {movie['parts']} parts" if part == ALL_PARTS else f"Part {part}"
         
         await query.message.edit_text(
-            f"✅ **{movie['title']}** - Part {part}\n\n"
+            f"✅ **{movie['title']}** - {label}\n\n"
             f"Click to download:",
             reply_markup=InlineKeyboardMarkup([
                 [InlineKeyboardButton("🔓 Download", url=short)],
@@ -75,6 +84,8 @@ def register_callback_handlers(app: Client):
     
     
     @app.on_callback_query(filters.regex(r"^back:"))
+    @updates.cheap
+    @metrics.handler
     async def back_cb(bot: Client, query: CallbackQuery):
         code = query.data.split(":")[1]
         movie = await db.get_movie(code)
@@ -83,15 +94,9 @@ def register_callback_handlers(app: Client):
             await query.answer("❌ Not found!", show_alert=True)
             return
         
-        buttons = []
-        for i in range(1, movie["parts"] + 1):
-            buttons.append(InlineKeyboardButton(f"📦 Part {i}", callback_data=f"part:{code}:{i}"))
-        
-        kb = [buttons[i:i+3] for i in range(0, len(buttons), 3)]
-        
         await query.message.edit_text(
             f"🎬 **{movie['title']}**\n\nSelect part:",
-            reply_markup=InlineKeyboardMarkup(kb),
+            reply_markup=parts_keyboard(code, movie["parts"]),
             parse_mode=ParseMode.MARKDOWN
         )
         await query.answer()
\ No newline at end of file
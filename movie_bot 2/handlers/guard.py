@@ -0,0 +1,52 @@
+if __name__ == "__main__":
+    exit("Run bot.py instead!")
+
+import logging
+from pyrogram import Client, filters
+from pyrogram.types import Message, CallbackQuery
+from config import Config
+from metrics import metrics
+from ratelimit import FloodGuard
+
+logger = logging.getLogger(__name__)
+
+flood_guard = FloodGuard(Config.FLOOD_LIMITS)
+
+GUARD_GROUP = -1
+
+
+def message_kind(message: Message) -> str:
+    text = message.text or ""
+    if text.startswith("/"):
+        return text.split(maxsplit=1)[0][1:].split("@")[0].lower()
+    return "search" if text else "default"
+
+
+def register_guard_handlers(app: Client):
+    
+    # ============ FLOOD GUARD (runs before every other group) ============
+    @app.on_message(filters.private & ~filters.user(Config.ADMIN_ID), group=GUARD_GROUP)
+    @metrics.handler
+    async def guard_message(bot: Client, message: Message):
+        if not message.from_user:
+            return
+        
+        allowed, warn = flood_guard.check(message.from_user.id, message_kind(message))
+        if allowed:
+            return
+        
+        if warn:
+            await message.reply_text("⏳ Too many requests! Please slow down.")
+        message.stop_propagation()
+    
+    
+    @app.on_callback_query(~filters.user(Config.ADMIN_ID), group=GUARD_GROUP)
+    @metrics.handler
+    async def guard_callback(bot: Client, query: CallbackQuery):
+        allowed, warn = flood_guard.check(query.from_user.id, "callback")
+        if allowed:
+            return
+        
+        if warn:
+            await query.answer("⏳ Too many requests! Please slow down.", show_alert=True)
+        query.stop_propagation()
@@ -0,0 +1,91 @@
+if __name__ == "__main__":
+    exit("Run bot.py instead!")
+
+import logging
+from pyrogram import Client
+from pyrogram.enums import ParseMode
+from pyrogram.types import (
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    InlineKeyboardMarkup,
+    InlineKeyboardButton
+)
+from cache import TTLCache
+from config import Config
+from dispatch import updates
+from metrics import metrics
+from search_index import search_index
+from helpers import encode_payload, normalize_name, movie_info_cache
+
+logger = logging.getLogger(__name__)
+
+# Telegram accepts at most 50 results per answer
+PAGE_SIZE = 50
+
+# (index version, query) -> matching movies; a catalog change bumps the version
+inline_results = TTLCache(name="inline", maxsize=2000, ttl=Config.INLINE_CACHE_TIME)
+
+
+def find_inline(query: str) -> list:
+    """Matches for an inline query, served from the search index"""
+    key = (search_index.version, query)
+    movies = inline_results.get(key, None)
+    if movies is None:
+        if not query:
+            movies = search_index.browse(Config.INLINE_MAX_RESULTS)
+        else:
+            movies = (
+                search_index.search(query, limit=Config.INLINE_MAX_RESULTS)
+                or search_index.suggest(query, limit=PAGE_SIZE)
+            )
+        inline_results.set(key, movies)
+    return movies
+
+
+def build_result(bot_username: str, movie: dict) -> InlineQueryResultArticle:
+    parts = movie.get("parts", 1)
+    link = f"https://t.me/{bot_username}?start={encode_payload(movie['code'])}"
+    info = movie_info_cache.get(normalize_name(movie["title"]), None, count=False)
+    
+    description = f"📦 {parts} parts" if parts > 1 else "🎬 Movie"
+    if info:
+        description = f"{description} • {info.get('year', '')} • ⭐ {info.get('rating', 'N/A')}"
+    
+    return InlineQueryResultArticle(
+        id=movie["code"][:64],
+        title=movie["title"],
+        description=description,
+        input_message_content=InputTextMessageContent(
+            f"🎬 **{movie['title']}**" + (f"\n📦 Parts: {parts}" if parts > 1 else ""),
+            parse_mode=ParseMode.MARKDOWN
+        ),
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("📥 Download", url=link)]]),
+        thumb_url=info.get("poster") if info else None
+    )
+
+
+def register_inline_handlers(app: Client):
+    
+    # ============ INLINE SEARCH (@bot query) ============
+    @app.on_inline_query()
+    @updates.cheap
+    @metrics.handler
+    async def inline_search(bot: Client, query: InlineQuery):
+        if not search_index.ready:
+            # Catalog still loading - don't let Telegram cache the empty answer
+            await query.answer([], cache_time=1)
+            return
+        
+        movies = find_inline(normalize_name(query.query))
+        offset = int(query.offset) if query.offset.isdigit() else 0
+        page = movies[offset:offset + PAGE_SIZE]
+        next_offset = offset + PAGE_SIZE
+        
+        await query.answer(
+            [build_result(bot.me.username, m) for m in page],
+            # Same answer for everyone, so Telegram can serve repeats itself
+            cache_time=Config.INLINE_CACHE_TIME,
+            is_personal=False,
+            next_offset=str(next_offset) if next_offset < len(movies) else ""
+        )
@@ -0,0 +1,27 @@
+if __name__ == "__main__":
+    exit("Run bot.py instead!")
+
+import logging
+from pyrogram import Client, filters
+from pyrogram.types import ChatMemberUpdated
+from config import Config
+from dispatch import updates
+from metrics import metrics
+from helpers import cache_subscription, is_channel_member
+
+logger = logging.getLogger(__name__)
+
+
+def register_member_handlers(app: Client):
+    
+    # ============ BACKUP CHANNEL JOINS / LEAVES ============
+    @app.on_chat_member_updated(filters.chat(Config.BACKUP_CHANNEL_ID))
+    @updates.cheap
+    @metrics.handler
+    async def member_updated(bot: Client, update: ChatMemberUpdated):
+        member = update.new_chat_member or update.old_chat_member
+        if not member or not member.user:
+            return
+        
+        is_sub = bool(update.new_chat_member) and is_channel_member(update.new_chat_member)
+        cache_subscription(member.user.id, is_sub)
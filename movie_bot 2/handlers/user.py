@@ -2,18 +2,26 @@ if __name__ == "__main__":
     exit("Run bot.py instead!")
 
 import logging
+import time
 from pyrogram import Client, filters
+from pyrogram.errors import BadRequest
 from pyrogram.enums import ParseMode
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from config import Config
+from dispatch import updates
+from metrics import metrics
+from file_health import file_health
 from database import db
+from user_registry import user_registry
+from download_tokens import create_token, redeem_token
 from helpers import (
     check_subscription,
     get_movie_info,
     get_short_link,
     encode_payload,
     decode_payload,
-    normalize_name
+    normalize_name,
+    movie_info_cache
 )
 
 logger = logging.getLogger(__name__)
@@ -23,6 +31,8 @@ def register_user_handlers(app: Client):
     
     # ============ /start COMMAND ============
     @app.on_message(filters.command("start") & filters.private)
+    @updates.expensive
+    @metrics.handler
     async def start_cmd(bot: Client, message: Message):
         user_id = message.from_user.id
         username = message.from_user.username
@@ -31,7 +41,7 @@ def register_user_handlers(app: Client):
         logger.info(f"START from {user_id}: {text}")
         
         # Save user
-        await db.add_user(user_id, username)
+        user_registry.add(user_id, username)
         
         # Get payload
         parts = text.split(maxsplit=1)
@@ -80,30 +90,35 @@ def register_user_handlers(app: Client):
         
         # Has token - send file
         if token:
-            token_data = await db.verify_token(token, user_id)
+            token_data = await redeem_token(token, user_id, movie_code, part)
             
             if token_data:
                 movie = await db.get_movie(token_data["movie_code"])
                 
-                if movie:
+                if movie and token_data.get("part") == ALL_PARTS:
+                    sendable = [f for f in movie.get("file_ids") or [] if f]
+                    missing = await file_health.send_all(bot, user_id, movie) if sendable else []
+                    if sendable and not missing:
+                        return
+                    if sendable and len(missing) < len(sendable):
+                        # Partly delivered: say which parts failed and offer them one by one
+                        buttons = [InlineKeyboardButton(f"📦 Part {p}", callback_data=f"part:{movie['code']}:{p}") for p in missing]
+                        await message.reply_text(
+                            f"⚠️ Couldn't send part {', '.join(map(str, missing))} of **{movie['title']}**.\n"
+                            f"Try them one at a time:",
+                            reply_markup=InlineKeyboardMarkup([buttons[i:i+3] for i in range(0, len(buttons), 3)]),
+                            parse_mode=ParseMode.MARKDOWN
+                        )
+                        return
+                
+                elif movie:
                     part_idx = token_data.get("part", 1) - 1
                     file_ids = movie.get("file_ids", [])
                     
                     if 0 <= part_idx < len(file_ids) and file_ids[part_idx]:
-                        try:
-                            await bot.send_cached_media(
-                                chat_id=user_id,
-                                file_id=file_ids[part_idx],
-                                caption=f"🎬 **{movie['title']}**\n\n✅ Enjoy!",
-                                parse_mode=ParseMode.MARKDOWN
-                            )
-                        except:
-                            await message.reply_document(
-                                file_ids[part_idx],
-                                caption=f"🎬 **{movie['title']}**",
-                                parse_mode=ParseMode.MARKDOWN
-                            )
-                        return
+                        caption = f"🎬 **{movie['title']}**\n\n✅ Enjoy!"
+                        if await file_health.send(bot, user_id, movie, part_idx + 1, caption):
+                            return
                 
                 await message.reply_text("❌ File not available. Try searching again.")
                 return
@@ -120,23 +135,17 @@ def register_user_handlers(app: Client):
         
         # Multi-part
         if movie.get("parts", 1) > 1:
-            buttons = []
-            for i in range(1, movie["parts"] + 1):
-                buttons.append(InlineKeyboardButton(f"📦 Part {i}", callback_data=f"part:{movie_code}:{i}"))
-            
-            keyboard = [buttons[i:i+3] for i in range(0, len(buttons), 3)]
-            
             await message.reply_text(
                 f"🎬 **{movie['title']}**\n\n"
                 f"This movie has {movie['parts']} parts.\n"
                 f"Select one:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=parts_keyboard(movie_code, movie["parts"]),
                 parse_mode=ParseMode.MARKDOWN
             )
             return
         
         # Single part - generate link
-        new_token = await db.create_token(user_id, movie_code, part)
+        new_token = await create_token(user_id, movie_code, part)
         final_payload = encode_payload(movie_code, part, new_token)
         final_link = f"https://t.me/{bot.me.username}?start={final_payload}"
         
@@ -156,12 +165,15 @@ def register_user_handlers(app: Client):
     
     # ============ /help COMMAND ============
     @app.on_message(filters.command("help") & filters.private)
+    @updates.cheap
+    @metrics.handler
     async def help_cmd(bot: Client, message: Message):
         user_id = message.from_user.id
         
         text = (
             "🎬 **Movie Bot**\n\n"
-            "Send movie name to search.\n\n"
+            "Send movie name to search.\n"
+            f"Or type `@{bot.me.username} name` in any chat.\n\n"
             "**Examples:**\n"
             "• Dune\n"
             "• Avengers\n"
@@ -171,8 +183,11 @@ def register_user_handlers(app: Client):
         if user_id == Config.ADMIN_ID:
             text += (
                 "\n\n**Admin:**\n"
-                "`/add` `/addpart` `/delete`\n"
-                "`/list` `/stats` `/broadcast`"
+                "`/add` `/addpart` `/delete` `/import`\n"
+                "`/list` `/stats` `/broadcast`\n"
+                "`/bpause` `/bresume` `/bcancel`\n"
+                "`/checksub` `/subcache` `/dbstats` `/metrics`\n"
+                "`/jobs` `/job` `/jobcancel` `/jobrun`"
             )
         
         await message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
@@ -180,6 +195,8 @@ def register_user_handlers(app: Client):
     
     # ============ SEARCH (any text) ============
     @app.on_message(filters.text & filters.private)
+    @updates.expensive
+    @metrics.handler
     async def search_cmd(bot: Client, message: Message):
         text = message.text.strip()
         
@@ -188,7 +205,7 @@ def register_user_handlers(app: Client):
             return
         
         user_id = message.from_user.id
-        await db.add_user(user_id, message.from_user.username)
+        user_registry.add(user_id, message.from_user.username)
         
         query = normalize_name(text)
         
@@ -197,6 +214,11 @@ def register_user_handlers(app: Client):
             return
         
         movies = await db.search_movies(query)
+        suggested = False
+        if not movies:
+            # Misspelt? Try the catalog before spending a TMDB call
+            movies = db.suggest_movies(query)
+            suggested = bool(movies)
         
         if not movies:
             info = await get_movie_info(text)
@@ -214,8 +236,10 @@ def register_user_handlers(app: Client):
             return
         
         # Single result
-        if len(movies) == 1:
-            await send_movie_card(bot, message, movies[0])
+        if len(movies) == 1 and not suggested:
+            # Index hits are summaries; the card needs the stored poster and TMDB info
+            movie = await db.get_movie(movies[0]["code"]) or movies[0]
+            await send_movie_card(bot, message, movie)
             return
         
         # Multiple results
@@ -224,8 +248,9 @@ def register_user_handlers(app: Client):
             p = f" ({m.get('parts', 1)}p)" if m.get('parts', 1) > 1 else ""
             buttons.append([InlineKeyboardButton(f"🎬 {m['title']}{p}", callback_data=f"movie:{m['code']}")])
         
+        header = "🤔 No exact match. Did you mean:" if suggested else f"🔍 Found {len(movies)} results:"
         await message.reply_text(
-            f"🔍 Found {len(movies)} results:",
+            header,
             reply_markup=InlineKeyboardMarkup(buttons),
             parse_mode=ParseMode.MARKDOWN
         )
@@ -233,6 +258,18 @@ def register_user_handlers(app: Client):
 
 # ============ HELPER FUNCTIONS ============
 
+# Part number of a token covering every part of a movie
+ALL_PARTS = 0
+
+
+def parts_keyboard(code: str, parts: int) -> InlineKeyboardMarkup:
+    """Part buttons three to a row, then one link for all of them"""
+    buttons = [InlineKeyboardButton(f"📦 Part {i}", callback_data=f"part:{code}:{i}") for i in range(1, parts + 1)]
+    keyboard = [buttons[i:i+3] for i in range(0, len(buttons), 3)]
+    keyboard.append([InlineKeyboardButton(f"📚 All {parts} parts", callback_data=f"part:{code}:{ALL_PARTS}")])
+    return InlineKeyboardMarkup(keyboard)
+
+
 async def send_welcome(message: Message):
     await message.reply_text(
         "🎬 **Welcome to Movie Bot!**\n\n"
@@ -248,8 +285,20 @@ async def send_welcome(message: Message):
     )
 
 
-async def send_movie_card(bot: Client, message: Message, movie: dict):
+async def get_card_info(movie: dict) -> dict:
+    """TMDB info for a movie card, persisted on the movie document"""
+    if movie.get("tmdb") and time.time() - movie.get("tmdb_at", 0) < Config.TMDB_CACHE_TTL:
+        return movie["tmdb"]
+    
+    fresh = normalize_name(movie["title"]) not in movie_info_cache
     info = await get_movie_info(movie["title"])
+    if fresh and info:
+        await db.set_movie_info(movie["code"], info)
+    return info
+
+
+async def send_movie_card(bot: Client, message: Message, movie: dict):
+    info = await get_card_info(movie)
     
     parts = f"\n📦 Parts: {movie['parts']}" if movie.get('parts', 1) > 1 else ""
     
@@ -267,11 +316,45 @@ async def send_movie_card(bot: Client, message: Message, movie: dict):
     
     kb = InlineKeyboardMarkup([[InlineKeyboardButton("📥 Download", url=link)]])
     
-    if info and info.get("poster"):
+    url = info.get("poster") if info else None
+    if url:
+        cached = movie.get("poster_file_id") if movie.get("poster_url") == url else None
+        if cached:
+            try:
+                await message.reply_photo(cached, caption=caption, reply_markup=kb, parse_mode=ParseMode.MARKDOWN)
+                return
+            except BadRequest as e:
+                # Stale file_id - forget it and upload from the URL again
+                logger.info(f"Poster file_id for {movie['code']} rejected: {e}")
+                await db.set_poster(movie["code"])
         try:
-            await message.reply_photo(info["poster"], caption=caption, reply_markup=kb, parse_mode=ParseMode.MARKDOWN)
+            sent = await message.reply_photo(url, caption=caption, reply_markup=kb, parse_mode=ParseMode.MARKDOWN)
+        except Exception as e:
+            logger.warning(f"Poster send failed for {movie['code']}: {e}")
+        else:
+            await remember_poster(movie["code"], sent, url)
             return
-        except:
-            pass
     
-    await message.reply_text(caption, reply_markup=kb, parse_mode=ParseMode.MARKDOWN)
\ No newline at end of file
+    await message.reply_text(caption, reply_markup=kb, parse_mode=ParseMode.MARKDOWN)
+
+
+async def remember_poster(code: str, sent: Message, url: str):
+    photo = getattr(sent, "photo", None)
+    if photo:
+        await db.set_poster(code, photo.file_id, url)
+
+
+async def preload_poster(bot: Client, code: str):
+    """Upload a new movie's poster once so its first card is served by file_id"""
+    try:
+        movie = await db.get_movie(code)
+        info = await get_card_info(movie) if movie else None
+        url = info.get("poster") if info else None
+        if not url or movie.get("poster_url") == url:
+            return
+        
+        sent = await bot.send_photo(Config.POSTER_CACHE_CHAT or Config.ADMIN_ID, url, disable_notification=True)
+        await remember_poster(code, sent, url)
+        await sent.delete()
+    except Exception as e:
+        logger.warning(f"Poster preload failed for {code}: {e}")
\ No newline at end of file
@@ -1,78 +1,196 @@
 import logging
 import aiohttp
 import base64
+import hashlib
+import hmac
 import re
+import time
+from pyrogram.enums import ChatMemberStatus
+from cache import MISSING, SingleFlight, TTLCache
 from config import Config
+from http_client import http_client
+from metrics import metrics
+from shortener import shortener
 
 logger = logging.getLogger(__name__)
 
+# TMDB metadata keyed on normalized title (None = known miss)
+movie_info_cache = TTLCache(
+    name="tmdb",
+    maxsize=Config.TMDB_CACHE_SIZE,
+    ttl=Config.TMDB_CACHE_TTL,
+    negative_ttl=Config.TMDB_NEGATIVE_TTL
+)
+
+# Backup channel membership keyed on user id, kept fresh by chat member updates
+subscription_cache = TTLCache(
+    name="subscription",
+    maxsize=Config.SUB_CACHE_SIZE,
+    ttl=Config.SUB_CACHE_TTL
+)
+
+# get_chat_member calls in flight, shared by repeat checks for the same user
+subscription_flights = SingleFlight("get_chat_member")
+
+MEMBER_STATUSES = {ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.MEMBER}
+
 
 async def get_short_link(url: str) -> str:
-    """Shorten URL with GP Links"""
+    """Shorten URL with GP Links, falling back to the raw link"""
     if not Config.GPLINKS_API_KEY:
         return url
     
-    try:
-        api = f"{Config.GPLINKS_API_URL}?api={Config.GPLINKS_API_KEY}&url={url}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data.get("status") == "success":
-                        return data.get("shortenedUrl", url)
-        return url
-    except Exception as e:
-        logger.error(f"Shortener error: {e}")
-        return url
+    return await shortener.shorten(url, _fetch_short_link)
+
+
+async def _fetch_short_link(url: str) -> str:
+    """Call GP Links, raising on any non-success answer"""
+    api = f"{Config.GPLINKS_API_URL}?api={Config.GPLINKS_API_KEY}&url={url}"
+    with metrics.timer("http_request", upstream="gplinks") as t:
+        async with http_client.get(api, timeout=aiohttp.ClientTimeout(total=Config.SHORTENER_TIMEOUT)) as resp:
+            t.labels["status"] = resp.status
+            if resp.status != 200:
+                raise RuntimeError(f"GP Links status {resp.status}")
+            data = await resp.json()
+    
+    if data.get("status") != "success" or not data.get("shortenedUrl"):
+        raise RuntimeError(f"GP Links error: {data.get('message', data.get('status'))}")
+    return data["shortenedUrl"]
 
 
 async def get_movie_info(query: str) -> dict:
-    """Get movie info from TMDB"""
+    """Get movie info from TMDB (cached)"""
     if not Config.TMDB_API_KEY or not query:
         return None
     
-    try:
-        url = "https://api.themoviedb.org/3/search/movie"
-        params = {"api_key": Config.TMDB_API_KEY, "query": query}
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    if data.get("results"):
-                        m = data["results"][0]
-                        poster = f"https://image.tmdb.org/t/p/w500{m['poster_path']}" if m.get("poster_path") else None
-                        overview = m.get("overview", "")[:300]
-                        return {
-                            "title": m.get("title", "Unknown"),
-                            "year": m.get("release_date", "")[:4],
-                            "rating": m.get("vote_average", "N/A"),
-                            "overview": overview,
-                            "poster": poster
-                        }
+    key = normalize_name(query)
+    if not key:
         return None
+    
+    try:
+        return await movie_info_cache.get_or_load(key, _fetch_movie_info)
     except Exception as e:
         logger.error(f"TMDB error: {e}")
         return None
 
 
-async def check_subscription(bot, user_id: int) -> bool:
+async def _fetch_movie_info(query: str) -> dict:
+    """Fetch movie info from TMDB, raising on transport errors"""
+    url = f"{Config.TMDB_API_URL}/search/movie"
+    params = {"api_key": Config.TMDB_API_KEY, "query": query}
+    
+    with metrics.timer("http_request", upstream="tmdb") as t:
+        async with http_client.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            t.labels["status"] = resp.status
+            if resp.status != 200:
+                raise RuntimeError(f"TMDB status {resp.status}")
+            data = await resp.json()
+    
+    if not data.get("results"):
+        return None
+    
+    m = data["results"][0]
+    poster = f"https://image.tmdb.org/t/p/w500{m['poster_path']}" if m.get("poster_path") else None
+    overview = m.get("overview", "")[:300]
+    return {
+        "title": m.get("title", "Unknown"),
+        "year": m.get("release_date", "")[:4],
+        "rating": m.get("vote_average", "N/A"),
+        "overview": overview,
+        "poster": poster
+    }
+
+
+def is_channel_member(member) -> bool:
+    """True for a ChatMember that counts as subscribed.
+    
+    Restricted users are still in the channel only while is_member is set;
+    LEFT and BANNED never count.
+    """
+    if member.status in MEMBER_STATUSES:
+        return True
+    return member.status == ChatMemberStatus.RESTRICTED and bool(getattr(member, "is_member", False))
+
+
+def cache_subscription(user_id: int, is_sub: bool):
+    """Remember a membership result (negatives expire sooner)"""
+    ttl = None if is_sub else Config.SUB_CACHE_NEGATIVE_TTL
+    subscription_cache.set(user_id, is_sub, ttl=ttl)
+
+
+async def check_subscription(bot, user_id: int, use_cache: bool = True) -> bool:
     """Check if user joined channel"""
     if not Config.BACKUP_CHANNEL_ID:
         return True
     
+    if use_cache:
+        cached = subscription_cache.get(user_id)
+        if cached is not MISSING:
+            return cached
+    
+    return await subscription_flights.do(user_id, lambda: _fetch_subscription(bot, user_id))
+
+
+async def _fetch_subscription(bot, user_id: int) -> bool:
     try:
         member = await bot.get_chat_member(Config.BACKUP_CHANNEL_ID, user_id)
-        status = str(member.status).lower()
-        return any(s in status for s in ["member", "administrator", "creator", "owner"])
+        is_sub = is_channel_member(member)
     except Exception as e:
         error = str(e).lower()
-        if "user_not_participant" in error:
-            return False
-        if "chat_admin_required" in error:
-            logger.warning("Bot is not admin in channel!")
+        if "user_not_participant" not in error:
+            if "chat_admin_required" in error:
+                logger.warning("Bot is not admin in channel!")
+            # Fail open, but don't remember it
             return True
-        return True
+        is_sub = False
+    
+    cache_subscription(user_id, is_sub)
+    return is_sub
+
+
+def _token_key() -> bytes:
+    secret = Config.TOKEN_SECRET or f"download-token:{Config.BOT_TOKEN}"
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def _token_sig(movie_code: str, part: int, user_id: int, expires: int) -> str:
+    msg = f"{movie_code}|{part}|{user_id}|{expires}".encode()
+    digest = hmac.new(_token_key(), msg, hashlib.sha256).digest()[:9]
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+def sign_token(movie_code: str, part: int, user_id: int) -> str:
+    """Stateless download token: base36 expiry + truncated HMAC"""
+    expires = int(time.time()) + Config.TOKEN_TTL
+    return f"{_to_base36(expires)}.{_token_sig(movie_code, part, user_id, expires)}"
+
+
+def verify_signed_token(token: str, movie_code: str, part: int, user_id: int) -> int:
+    """Expiry timestamp of a valid signed token, else 0"""
+    try:
+        exp_part, sig = token.split(".", 1)
+        expires = int(exp_part, 36)
+    except ValueError:
+        return 0
+    if expires < time.time():
+        return 0
+    if not hmac.compare_digest(sig, _token_sig(movie_code, part, user_id, expires)):
+        return 0
+    return expires
+
+
+def is_signed_token(token: str) -> bool:
+    # token_urlsafe() never contains "."
+    return "." in token
+
+
+def _to_base36(n: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while n:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+    return out or "0"
 
 
 def encode_payload(movie_code: str, part: int = 1, token: str = "") -> str:
@@ -108,4 +226,23 @@ def decode_payload(payload: str) -> tuple:
 def normalize_name(text: str) -> str:
     """Normalize movie name"""
     text = re.sub(r'[^\w\s]', '', text)
-    return text.lower().strip()
\ No newline at end of file
+    return text.lower().strip()
+
+
+# Longest movie code that keeps every callback_data (e.g. list:n:{page}:{code})
+# inside Telegram's 64-byte limit
+MAX_CODE_BYTES = 40
+
+
+def code_fits(code: str) -> bool:
+    return len(code.encode()) <= MAX_CODE_BYTES
+
+
+def make_code(title: str) -> str:
+    """Movie code from a title; long ones are cut and given a short hash suffix"""
+    code = normalize_name(title).replace(" ", "_")
+    if code_fits(code):
+        return code
+    digest = hashlib.sha1(code.encode()).hexdigest()[:8]
+    head = code.encode()[:MAX_CODE_BYTES - len(digest) - 1].decode(errors="ignore").rstrip("_")
+    return f"{head}_{digest}"
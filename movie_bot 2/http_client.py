@@ -0,0 +1,48 @@
+import logging
+from urllib.parse import urlsplit
+import aiohttp
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClient:
+    """Shared keep-alive sessions, one connection pool per upstream host"""
+
+    def __init__(self):
+        self._sessions = {}
+        self.closed = False
+
+    def session(self, url: str) -> aiohttp.ClientSession:
+        host = urlsplit(url).hostname or ""
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            if self.closed:
+                raise RuntimeError("HTTP client is closed")
+            limit = Config.HTTP_HOST_LIMITS.get(host, Config.HTTP_LIMIT_PER_HOST)
+            connector = aiohttp.TCPConnector(
+                limit=limit,
+                limit_per_host=limit,
+                ttl_dns_cache=Config.HTTP_DNS_TTL,
+                keepalive_timeout=Config.HTTP_KEEPALIVE
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=Config.HTTP_TIMEOUT)
+            )
+            self._sessions[host] = session
+            logger.info(f"HTTP pool opened for {host} (limit {limit})")
+        return session
+
+    def get(self, url: str, **kwargs):
+        return self.session(url).get(url, **kwargs)
+
+    async def close(self):
+        self.closed = True
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            await session.close()
+
+
+# Global instance
+http_client = HTTPClient()
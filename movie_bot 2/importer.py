@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import re
+import time
+from pyrogram.errors import FloodWait, MessageNotModified
+from config import Config
+from database import db
+from helpers import code_fits, make_code, normalize_name
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "import"
+
+# Release noise that ends a title taken from a file name
+NOISE = re.compile(
+    r"[\s(\[]*\b(?:(?:19|20)\d{2}|\d{3,4}p|x26[45]|h\.?26[45]|hevc|web-?dl|web-?rip|blu-?ray|hdrip|brrip|dvdrip|hdtv)\b.*$",
+    re.IGNORECASE
+)
+
+
+def clean_title(raw: str) -> str:
+    title = re.sub(r"[._]+", " ", raw)
+    title = NOISE.sub("", title)
+    return re.sub(r"\s+", " ", title).strip(" -[]()")
+
+
+def parse_entry(message, patterns: list):
+    """(code, title, part, file_id) for a channel post, or None"""
+    media = message.video or message.document
+    if not media:
+        return None
+
+    texts = []
+    if message.caption:
+        texts.append(message.caption.strip().splitlines()[0])
+    if getattr(media, "file_name", None):
+        texts.append(media.file_name)
+
+    for text in texts:
+        for pattern in patterns:
+            match = pattern.match(text)
+            if not match:
+                continue
+            groups = match.groupdict()
+            title = clean_title(groups.get("title") or "")
+            if groups.get("code"):
+                code = normalize_name(groups["code"]).replace(" ", "_")
+                if not code_fits(code):
+                    logger.debug(f"Skipping message {message.id}: code too long")
+                    continue
+            else:
+                code = make_code(title)
+            if not code:
+                continue
+            part = int(groups["part"]) if groups.get("part") else 1
+            return code, title or code.replace("_", " ").title(), max(part, 1), media.file_id
+    return None
+
+
+class CatalogImporter:
+    """Walks the backup channel by message id and bulk-upserts recognized files.
+
+    Bots can't read chat history, so posts are fetched by id in batches of
+    up to 200. Progress is checkpointed after every batch so an interrupted
+    run continues with /import resume.
+    """
+
+    def __init__(self, patterns: list, batch_size: int = 200, stop_after_empty: int = 3, status_every: float = 5):
+        self.patterns = [re.compile(p, re.IGNORECASE) for p in patterns]
+        self.batch_size = batch_size
+        self.stop_after_empty = stop_after_empty
+        self.status_every = status_every
+        self.state = None
+        self.cancelled = False
+        self.task = None
+
+    @property
+    def busy(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    # Control
+    async def start(self, bot, status, from_id: int = 1, to_id: int = None, dry_run: bool = False):
+        if self.busy:
+            raise RuntimeError("An import is already running")
+
+        state = {
+            "chat_id": Config.BACKUP_CHANNEL_ID,
+            "next_id": max(from_id, 1),
+            "to_id": to_id,
+            "dry_run": dry_run,
+            "status_chat_id": status.chat.id,
+            "status_message_id": status.id,
+            "scanned": 0,
+            "files": 0,
+            "skipped": 0,
+            "new": 0,
+            "updated": 0,
+            "started_at": time.time()
+        }
+        if not dry_run:
+            await db.set_state(STATE_KEY, state)
+        self._launch(bot, state)
+
+    async def resume(self, bot, status) -> bool:
+        """Continue a checkpointed import; False if there is none"""
+        if self.busy:
+            raise RuntimeError("An import is already running")
+        state = await db.get_state(STATE_KEY)
+        if not state:
+            return False
+        state["status_chat_id"] = status.chat.id
+        state["status_message_id"] = status.id
+        self._launch(bot, state)
+        return True
+
+    def cancel(self) -> bool:
+        if not self.busy:
+            return False
+        self.cancelled = True
+        return True
+
+    async def stop(self):
+        """Stop on shutdown, leaving the checkpoint for /import resume"""
+        if self.busy:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def _launch(self, bot, state: dict):
+        self.state = state
+        self.cancelled = False
+        self.task = asyncio.create_task(self._run(bot, state))
+
+    # Engine
+    async def _fetch(self, bot, chat_id: int, ids: list) -> list:
+        while True:
+            try:
+                messages = await bot.get_messages(chat_id, ids)
+                return [m for m in messages if m and not m.empty]
+            except FloodWait as e:
+                logger.warning(f"Import FloodWait: sleeping {e.value}s")
+                await asyncio.sleep(e.value)
+
+    async def _run(self, bot, state: dict):
+        preview = {}        # dry run: everything found, written nowhere
+        empty = 0
+        last_status = 0.0
+        try:
+            while not self.cancelled:
+                start = state["next_id"]
+                end = start + self.batch_size
+                if state["to_id"]:
+                    end = min(end, state["to_id"] + 1)
+                if start >= end:
+                    break
+
+                messages = await self._fetch(bot, state["chat_id"], list(range(start, end)))
+                empty = 0 if messages else empty + 1
+                if not state["to_id"] and empty >= self.stop_after_empty:
+                    break
+
+                found = preview if state["dry_run"] else {}
+                for message in messages:
+                    entry = parse_entry(message, self.patterns)
+                    if not entry:
+                        state["skipped"] += 1
+                        continue
+                    code, title, part, file_id = entry
+                    item = found.setdefault(code, {"title": title, "files": {}, "sources": {}})
+                    item["files"][part] = file_id
+                    item["sources"][part] = message.id
+                    state["files"] += 1
+
+                if found and not state["dry_run"]:
+                    new, updated = await db.import_movies(found)
+                    state["new"] += new
+                    state["updated"] += updated
+
+                state["scanned"] += end - start
+                state["next_id"] = end
+                if not state["dry_run"]:
+                    await db.set_state(STATE_KEY, state)
+
+                if time.monotonic() - last_status >= self.status_every:
+                    last_status = time.monotonic()
+                    await self._report(bot, state)
+
+            if state["dry_run"] and preview:
+                state["new"], state["updated"] = await db.import_movies(preview, dry_run=True)
+            if not self.cancelled and not state["dry_run"]:
+                await db.set_state(STATE_KEY, None)
+            await self._report(bot, state, final=True, preview=preview)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Import crashed at message {state['next_id']}: {e}")
+            await self._report(bot, state, final=True, error=str(e))
+
+    async def _report(self, bot, state: dict, final: bool = False, preview: dict = None, error: str = None):
+        if error:
+            head = "❌ Import stopped (use /import resume)"
+        elif final and self.cancelled:
+            head = "🛑 Import cancelled (use /import resume)"
+        elif final:
+            head = "🧪 Dry run done" if state["dry_run"] else "✅ Import done!"
+        else:
+            head = "🧪 Dry run..." if state["dry_run"] else "📥 Importing..."
+
+        text = (
+            f"{head}\n"
+            f"🔎 Scanned up to: {state['next_id'] - 1}\n"
+            f"🎞 Files: {state['files']}\n"
+            f"🆕 New movies: {state['new']}\n"
+            f"♻️ Updated: {state['updated']}\n"
+            f"⏭ Skipped: {state['skipped']}"
+        )
+        if preview:
+            sample = list(preview.items())[:10]
+            text += "\n\n" + "\n".join(
+                f"• `{code}` {item['title']} ({len(item['files'])}p)" for code, item in sample
+            )
+        if error:
+            text += f"\n\n{error}"
+
+        try:
+            await bot.edit_message_text(state["status_chat_id"], state["status_message_id"], text)
+        except MessageNotModified:
+            pass
+        except Exception as e:
+            logger.debug(f"Import status update failed: {e}")
+
+
+# Global instance
+importer = CatalogImporter(Config.IMPORT_PATTERNS, batch_size=Config.IMPORT_BATCH_SIZE)
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from config import Config
+from database import db
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobQueue:
+    """Durable jobs in storage, run by leased workers with retries.
+
+    A claimed job is leased for `lease` seconds and the lease is renewed
+    while it runs; a worker that dies simply lets the lease expire and the
+    job is claimed again. Failures retry with exponential backoff until
+    max_attempts.
+    """
+
+    def __init__(self, concurrency: int = 2, lease: float = 60, poll_interval: float = 2,
+                 backoff: float = 30, max_backoff: float = 3600):
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.tasks = {}         # name -> (func, max_attempts, timeout)
+        self.workers = []
+        self.wakeup = asyncio.Event()
+
+    # Registration
+    def task(self, name: str, max_attempts: int = 5, timeout: float = None):
+        """Register `async def func(payload: dict)` as a job type"""
+        def decorator(func):
+            self.tasks[name] = (func, max_attempts, timeout)
+            return func
+        return decorator
+
+    # Producer side
+    async def enqueue(self, task: str, payload: dict = None, priority: int = 0, delay: float = 0,
+                      unique_key: str = None, max_attempts: int = None):
+        """Queue a job; returns its id, or None if `unique_key` is already pending"""
+        if task not in self.tasks:
+            raise ValueError(f"Unknown task: {task}")
+        now = time.time()
+        job_id = await db.create_job({
+            "task": task,
+            "payload": payload or {},
+            "priority": priority,
+            "status": QUEUED,
+            "run_at": now + delay,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.tasks[task][1],
+            "active_key": unique_key,
+            "created_at": now
+        })
+        if job_id is not None:
+            self.wakeup.set()
+        return job_id
+
+    async def cancel(self, job_id) -> bool:
+        """Cancel a queued or running job; a running one stops at its next heartbeat"""
+        job = await db.get_job(job_id)
+        if not job or job["status"] not in (QUEUED, RUNNING):
+            return False
+        return await db.update_job(job_id, {
+            "status": CANCELLED,
+            "active_key": None,
+            "finished_at": time.time()
+        })
+
+    # Worker side
+    def start(self):
+        if not self.workers:
+            self.workers = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Stop claiming; jobs interrupted here are re-run once their lease expires"""
+        for worker in self.workers:
+            worker.cancel()
+        for worker in self.workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self.workers = []
+
+    async def _loop(self):
+        while True:
+            try:
+                job = await db.claim_job(self.worker_id, time.time(), self.lease)
+            except Exception as e:
+                logger.error(f"Job claim error: {e}")
+                job = None
+
+            if job:
+                await self._execute(job)
+                continue
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, job: dict, runner: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            renewed = await db.update_job(job["id"], {"lease_until": time.time() + self.lease}, worker=self.worker_id)
+            if not renewed:
+                # Cancelled, or the lease was lost to another worker
+                runner.cancel()
+                return
+
+    async def _execute(self, job: dict):
+        name = job["task"]
+        if name not in self.tasks:
+            await self._finish(job, FAILED, error=f"Unknown task: {name}")
+            return
+        func, _, timeout = self.tasks[name]
+        if job["attempts"] > job["max_attempts"]:
+            # Reclaimed after crashing the worker too many times
+            await self._finish(job, FAILED, error=job.get("error") or "Lease expired too often")
+            return
+
+        runner = asyncio.create_task(asyncio.wait_for(func(job["payload"]), timeout))
+        heartbeat = asyncio.create_task(self._heartbeat(job, runner))
+        try:
+            with metrics.timer("job", task=name) as t:
+                try:
+                    result = await runner
+                    t.labels["status"] = DONE
+                except asyncio.CancelledError:
+                    # The heartbeat only finishes by cancelling the runner
+                    if not heartbeat.done():
+                        raise
+                    t.labels["status"] = CANCELLED
+                    logger.info(f"Job {job['id']} ({name}) stopped: cancelled or lease lost")
+                    return
+                except Exception as e:
+                    t.labels["status"] = "error"
+                    await self._retry(job, e)
+                    return
+            await self._finish(job, DONE, result=result)
+        finally:
+            heartbeat.cancel()
+
+    async def _retry(self, job: dict, error: Exception):
+        error = f"{type(error).__name__}: {error}"
+        if job["attempts"] >= job["max_attempts"]:
+            logger.error(f"Job {job['id']} ({job['task']}) failed for good: {error}")
+            await self._finish(job, FAILED, error=error)
+            return
+        delay = min(self.backoff * 2 ** (job["attempts"] - 1), self.max_backoff)
+        logger.warning(f"Job {job['id']} ({job['task']}) failed, retrying in {delay:.0f}s: {error}")
+        await db.update_job(job["id"], {
+            "status": QUEUED,
+            "run_at": time.time() + delay,
+            "lease_until": None,
+            "error": error
+        }, worker=self.worker_id)
+
+    async def _finish(self, job: dict, status: str, result=None, error: str = None):
+        await db.update_job(job["id"], {
+            "status": status,
+            "result": result,
+            "error": error,
+            "lease_until": None,
+            "active_key": None,
+            "finished_at": time.time()
+        }, worker=self.worker_id)
+
+
+# ============ SCHEDULER ============
+
+def _cron_field(spec: str, low: int, high: int) -> set:
+    """One cron field (*, */n, a-b, a-b/n, lists) as a set of values"""
+    values = set()
+    for part in spec.split(","):
+        rng, _, step = part.partition("/")
+        if rng == "*":
+            start, end = low, high
+        elif "-" in rng:
+            start, end = (int(x) for x in rng.split("-", 1))
+        else:
+            start = end = int(rng)
+        values.update(range(start, end + 1, int(step) if step else 1))
+    if not values or min(values) < low or max(values) > high:
+        raise ValueError(f"Bad cron field: {spec}")
+    return values
+
+
+class Cron:
+    """Five-field cron expression (minute hour day month weekday), local time.
+
+    As in cron, when both day and weekday are restricted a day matching
+    either one fires.
+    """
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron needs 5 fields: {expr}")
+        self.expr = expr
+        self.minutes = _cron_field(fields[0], 0, 59)
+        self.hours = _cron_field(fields[1], 0, 23)
+        self.days = _cron_field(fields[2], 1, 31)
+        self.months = _cron_field(fields[3], 1, 12)
+        # Cron weekdays: 0 (or 7) = Sunday; tm_wday: 0 = Monday
+        self.weekdays = {(d - 1) % 7 for d in _cron_field(fields[4], 0, 7)}
+        self.either_day = not fields[2].startswith("*") and not fields[4].startswith("*")
+
+    def _day_matches(self, tm) -> bool:
+        in_month = tm.tm_mday in self.days
+        in_week = tm.tm_wday in self.weekdays
+        return in_month or in_week if self.either_day else in_month and in_week
+
+    def next_after(self, ts: float) -> float:
+        t = (int(ts) // 60 + 1) * 60
+        limit = t + 366 * 86400
+        while t < limit:
+            tm = time.localtime(t)
+            if tm.tm_mon not in self.months or not self._day_matches(tm):
+                t += 86400 - (tm.tm_hour * 3600 + tm.tm_min * 60)
+            elif tm.tm_hour not in self.hours:
+                t += 3600 - tm.tm_min * 60
+            elif tm.tm_min not in self.minutes:
+                t += 60
+            else:
+                return float(t)
+        raise ValueError(f"Cron never fires: {self.expr}")
+
+
+class Scheduler:
+    """Enqueues periodic jobs; run it in exactly one process.
+
+    The last run of each schedule is kept in storage so a restart neither
+    repeats nor skips a slot, and a unique key stops runs from piling up
+    behind a slow one.
+    """
+
+    def __init__(self, queue: JobQueue, tick: float = 30):
+        self.queue = queue
+        self.tick = tick
+        self.schedules = {}     # name -> dict
+        self.task = None
+
+    def add(self, name: str, task: str, cron: str = None, every: float = None,
+            payload: dict = None, priority: int = 0):
+        if bool(cron) == bool(every):
+            raise ValueError("Give exactly one of cron or every")
+        self.schedules[name] = {
+            "task": task,
+            "cron": Cron(cron) if cron else None,
+            "every": every,
+            "payload": payload,
+            "priority": priority
+        }
+
+    def _next_run(self, schedule: dict, last: float) -> float:
+        if schedule["cron"]:
+            return schedule["cron"].next_after(last)
+        return last + schedule["every"]
+
+    async def run_due(self):
+        now = time.time()
+        for name, schedule in self.schedules.items():
+            state = await db.get_state(f"schedule:{name}")
+            if state is None:
+                # First sight: start counting from now rather than firing at once
+                await db.set_state(f"schedule:{name}", {"last_run": now})
+                continue
+            if self._next_run(schedule, state["last_run"]) > now:
+                continue
+            job_id = await self.queue.enqueue(
+                schedule["task"], schedule["payload"], priority=schedule["priority"],
+                unique_key=f"schedule:{name}"
+            )
+            await db.set_state(f"schedule:{name}", {"last_run": now, "job_id": job_id})
+            logger.info(f"Scheduled {name}: job {job_id or 'skipped (previous run pending)'}")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Scheduler error: {e}")
+            await asyncio.sleep(self.tick)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+# Global instances
+queue = JobQueue(
+    concurrency=Config.JOBS_CONCURRENCY,
+    lease=Config.JOBS_LEASE,
+    poll_interval=Config.JOBS_POLL_INTERVAL
+)
+scheduler = Scheduler(queue)
@@ -0,0 +1,186 @@
+import functools
+import inspect
+import logging
+import time
+from pyrogram import ContinuePropagation, StopPropagation
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds: 0.5 ms doubling up to ~65 s
+BUCKETS = tuple(0.0005 * 2 ** i for i in range(18)) + (float("inf"),)
+
+# Control flow exceptions pyrogram uses between handler groups
+PROPAGATION = (StopPropagation, ContinuePropagation)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with interpolated quantiles"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if BUCKETS[i] != float("inf") else lower * 2
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-2]
+
+
+class Timer:
+    """Context manager that records into a histogram on exit"""
+
+    def __init__(self, registry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if exc_type is not None and not issubclass(exc_type, PROPAGATION):
+            self.labels.setdefault("status", "error")
+            self.registry.inc(f"{self.name}_errors", **{k: v for k, v in self.labels.items() if k != "status"})
+        self.registry.observe(self.name, elapsed, **self.labels)
+        return False
+
+
+class Metrics:
+    """Process-wide counters, gauges and latency histograms"""
+
+    def __init__(self):
+        self.histograms = {}    # (name, labels) -> Histogram
+        self.counters = {}      # (name, labels) -> int
+        self.gauges = {}        # (name, labels) -> current value
+        self.started = time.time()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.observe(seconds)
+
+    def inc(self, name: str, value: int = 1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self.gauges[self._key(name, labels)] = value
+
+    def timer(self, name: str, **labels) -> Timer:
+        """`with metrics.timer(...) as t:` - t.labels may be filled in inside"""
+        return Timer(self, name, labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator timing a coroutine function"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def handler(self, func):
+        """Decorator for pyrogram handlers, labelled by function name"""
+        return self.timed("handler", handler=func.__name__)(func)
+
+    def instrument(self, name: str):
+        """Class decorator timing every public coroutine method"""
+        def decorator(cls):
+            for attr, value in list(vars(cls).items()):
+                if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+                    setattr(cls, attr, self.timed(name, method=attr)(value))
+            return cls
+        return decorator
+
+    # Reporting
+    def summary(self) -> list:
+        """[(name, labels, count, p50, p95, p99)] sorted by name then count"""
+        rows = [
+            (name, dict(labels), h.count, h.quantile(0.5), h.quantile(0.95), h.quantile(0.99))
+            for (name, labels), h in self.histograms.items()
+        ]
+        return sorted(rows, key=lambda r: (r[0], -r[2]))
+
+    def counter(self, name: str, **labels) -> int:
+        return self.counters.get(self._key(name, labels), 0)
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        def fmt(labels, extra=None):
+            items = list(labels) + ([extra] if extra else [])
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        for name in sorted({n for n, _ in self.histograms}):
+            lines.append(f"# TYPE moviebot_{name}_seconds histogram")
+            for (n, labels), h in self.histograms.items():
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"moviebot_{name}_seconds_bucket{fmt(labels, ('le', le))} {cumulative}")
+                lines.append(f"moviebot_{name}_seconds_sum{fmt(labels)} {h.sum}")
+                lines.append(f"moviebot_{name}_seconds_count{fmt(labels)} {h.count}")
+
+        for name in sorted({n for n, _ in self.counters}):
+            lines.append(f"# TYPE moviebot_{name}_total counter")
+            for (n, labels), value in self.counters.items():
+                if n == name:
+                    lines.append(f"moviebot_{name}_total{fmt(labels)} {value}")
+
+        for name in sorted({n for n, _ in self.gauges}):
+            lines.append(f"# TYPE moviebot_{name} gauge")
+            for (n, labels), value in self.gauges.items():
+                if n == name:
+                    lines.append(f"moviebot_{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+metrics = Metrics()
+
+
+async def start_metrics_server(port: int):
+    """Serve /metrics in Prometheus format on localhost; returns the runner"""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.prometheus(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    logger.info(f"Metrics on http://127.0.0.1:{port}/metrics")
+    return runner
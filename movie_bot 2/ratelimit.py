@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens without waiting; False if the bucket is short"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return False
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available and take them"""
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (e.g. on FloodWait)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class FloodGuard:
+    """Per-user token buckets with idle eviction"""
+
+    def __init__(self, limits: dict, idle_after: float = 600, max_keys: int = 100000):
+        # limits: {kind: (updates, seconds)}; "default" covers unknown kinds
+        self.limits = limits
+        self.idle_after = idle_after
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()    # (user_id, kind) -> TokenBucket
+        self.allowed = 0
+        self.dropped = 0
+
+    def _limit(self, kind: str) -> tuple:
+        return self.limits.get(kind) or self.limits.get("default") or (20, 60)
+
+    def _evict(self, now: float):
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if len(self.buckets) <= self.max_keys and now - bucket.updated < self.idle_after:
+                break
+            del self.buckets[key]
+
+    def check(self, user_id: int, kind: str) -> tuple:
+        """(allowed, warn) for one update; warn is True once per throttled burst"""
+        now = time.monotonic()
+        key = (user_id, kind)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            updates, seconds = self._limit(kind)
+            bucket = TokenBucket(updates / seconds, updates)
+            bucket.warned = False
+            self.buckets[key] = bucket
+        self.buckets.move_to_end(key)
+        self._evict(now)
+
+        if bucket.try_acquire():
+            bucket.warned = False
+            self.allowed += 1
+            return True, False
+
+        self.dropped += 1
+        warn = not bucket.warned
+        bucket.warned = True
+        return False, warn
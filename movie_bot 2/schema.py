@@ -0,0 +1,161 @@
+import logging
+import time
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# ============ MIGRATIONS ============
+
+async def _tokens_created_at_to_date(db):
+    """Tokens stored created_at as epoch seconds; TTL indexes need dates"""
+    await db.tokens.update_many(
+        {"created_at": {"$type": "number"}},
+        [{"$set": {"created_at": {"$toDate": {"$multiply": ["$created_at", 1000]}}}}]
+    )
+
+
+async def _dedupe_unique_keys(db):
+    """Drop duplicate documents that would block the unique indexes"""
+    for coll, key in ((db.movies, "code"), (db.users, "user_id"), (db.tokens, "token")):
+        pipeline = [
+            {"$group": {"_id": f"${key}", "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+            {"$match": {"n": {"$gt": 1}}}
+        ]
+        async for dup in coll.aggregate(pipeline, allowDiskUse=True):
+            # Keep the newest document
+            extra = sorted(dup["ids"])[:-1]
+            await coll.delete_many({"_id": {"$in": extra}})
+            logger.warning(f"Removed {len(extra)} duplicate {coll.name}.{key}={dup['_id']!r}")
+
+
+MIGRATIONS = [
+    (1, "tokens.created_at to date", _tokens_created_at_to_date),
+    (2, "dedupe unique keys", _dedupe_unique_keys),
+]
+
+
+# ============ INDEXES ============
+
+def _indexes(db):
+    """(collection, keys, options) for every index the bot relies on"""
+    return [
+        (db.movies, [("code", ASCENDING)], {"name": "code_unique", "unique": True}),
+        (db.users, [("user_id", ASCENDING)], {"name": "user_id_unique", "unique": True}),
+        (db.tokens, [("token", ASCENDING)], {"name": "token_unique", "unique": True}),
+        (db.tokens, [("created_at", ASCENDING)], {
+            "name": "created_at_ttl",
+            "expireAfterSeconds": Config.TOKEN_EXPIRE_AFTER
+        }),
+        (db.broadcasts, [("status", ASCENDING)], {"name": "status"}),
+        (db.jobs, [("status", ASCENDING), ("priority", DESCENDING), ("run_at", ASCENDING)], {"name": "runnable"}),
+        # Held only while queued/running, so one pending job per key
+        (db.jobs, [("active_key", ASCENDING)], {"name": "active_key_unique", "unique": True, "sparse": True}),
+    ]
+
+
+class SchemaManager:
+    """Versioned migrations plus index creation/verification for MongoStorage"""
+
+    def __init__(self, store):
+        self.store = store
+        self.meta = store.meta
+
+    async def get_version(self) -> int:
+        doc = await self.meta.find_one({"_id": "schema"})
+        return doc["version"] if doc else 0
+
+    async def migrate(self):
+        version = await self.get_version()
+        for target, name, fn in MIGRATIONS:
+            if target <= version:
+                continue
+            start = time.monotonic()
+            await fn(self.store)
+            await self.meta.update_one(
+                {"_id": "schema"},
+                {"$set": {"version": target, "migrated_at": time.time()}},
+                upsert=True
+            )
+            version = target
+            logger.info(f"Migration {target} ({name}) done in {time.monotonic() - start:.1f}s")
+
+    async def ensure_indexes(self):
+        for coll, keys, options in _indexes(self.store):
+            try:
+                await coll.create_index(keys, **options)
+            except OperationFailure as e:
+                # Same keys with different options - fix the existing index by hand
+                if e.code in (85, 86) and "expireAfterSeconds" in options:
+                    await coll.database.command(
+                        "collMod", coll.name,
+                        index={"keyPattern": dict(keys), "expireAfterSeconds": options["expireAfterSeconds"]}
+                    )
+                else:
+                    logger.error(f"Index {coll.name}.{options['name']} failed: {e}")
+        await self.verify_indexes()
+
+    async def verify_indexes(self) -> bool:
+        ok = True
+        for coll, keys, options in _indexes(self.store):
+            info = await coll.index_information()
+            match = [i for i in info.values() if i["key"] == keys]
+            if not match:
+                logger.error(f"Missing index on {coll.name}: {keys}")
+                ok = False
+            elif options.get("unique") and not match[0].get("unique"):
+                logger.error(f"Index on {coll.name}: {keys} is not unique")
+                ok = False
+        return ok
+
+    async def bootstrap(self):
+        await self.migrate()
+        await self.ensure_indexes()
+
+    # ============ DIAGNOSTICS ============
+
+    async def index_usage(self) -> dict:
+        """{collection: [(index name, ops since restart)]} from $indexStats"""
+        usage = {}
+        db = self.store
+        for coll in (db.movies, db.users, db.tokens, db.broadcasts):
+            stats = await coll.aggregate([{"$indexStats": {}}]).to_list(length=None)
+            usage[coll.name] = sorted(
+                ((s["name"], s["accesses"]["ops"]) for s in stats),
+                key=lambda s: -s[1]
+            )
+        return usage
+
+    async def explain_hot_queries(self) -> dict:
+        """Winning plan summary for the queries every update path runs"""
+        db = self.store
+        queries = {
+            "get_movie": (db.movies, {"code": ""}),
+            "add_user": (db.users, {"user_id": 0}),
+            "verify_token": (db.tokens, {"token": "", "user_id": 0, "used": False}),
+        }
+        plans = {}
+        for name, (coll, query) in queries.items():
+            explain = await coll.find(query).explain()
+            stats = explain.get("executionStats", {})
+            plans[name] = {
+                "stages": _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})),
+                "docs_examined": stats.get("totalDocsExamined"),
+                "millis": stats.get("executionTimeMillis")
+            }
+        return plans
+
+
+def _plan_stages(plan: dict) -> str:
+    stages = []
+    while plan:
+        plan = plan.get("queryPlan", plan)
+        stage = plan.get("stage")
+        if stage:
+            stages.append(stage + (f"({plan['indexName']})" if plan.get("indexName") else ""))
+        inputs = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+        plan = inputs
+    return " <- ".join(stages) or "?"
+
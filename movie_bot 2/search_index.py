@@ -0,0 +1,283 @@
+import heapq
+import logging
+import time
+from collections import defaultdict
+from config import Config
+from helpers import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SearchIndex:
+    """In-memory inverted index over movie codes and titles.
+
+    Alongside the n-gram postings it keeps a SymSpell-style table of
+    precomputed deletes over the word vocabulary, so `suggest` can map a
+    misspelt word to catalog words with a few dict lookups.
+    """
+
+    def __init__(self, ngram: int = 3, max_distance: int = 2, prefix: int = 7, budget_ms: float = 1.0):
+        self.ngram = ngram
+        self.max_distance = max_distance
+        self.prefix = prefix
+        self.budget = budget_ms / 1000
+        self.docs = {}                       # code -> {"code", "title", "parts"}
+        self.texts = {}                      # code -> (normalized code, normalized title)
+        self.postings = defaultdict(set)     # term -> codes
+        self.vocab = defaultdict(set)        # word -> codes
+        self.deletes = defaultdict(set)      # delete variant -> words
+        self.version = 0                     # bumped on every change
+        self.ready = False
+
+    # Terms
+    def _grams(self, word: str) -> set:
+        n = self.ngram
+        if len(word) < n:
+            return {word}
+        return {word[i:i + n] for i in range(len(word) - n + 1)}
+
+    @staticmethod
+    def _words(code: str, title: str) -> set:
+        return set(f"{code.replace('_', ' ')} {title}".split())
+
+    def _terms(self, code: str, title: str) -> set:
+        terms = set()
+        for word in self._words(code, title):
+            terms.add(word)
+            terms |= self._grams(word)
+        return terms
+
+    def _distance_for(self, word: str) -> int:
+        """Edits tolerated for a word of this length"""
+        if len(word) < 4:
+            return 0
+        return min(self.max_distance, 1 if len(word) < 8 else 2)
+
+    def _variants(self, word: str, distance: int) -> set:
+        """The word's prefix with up to `distance` characters deleted"""
+        variants = {word[:self.prefix]}
+        edge = set(variants)
+        for _ in range(distance):
+            edge = {w[:i] + w[i + 1:] for w in edge if len(w) > 1 for i in range(len(w))}
+            variants |= edge
+        return variants
+
+    def _add_word(self, word: str, code: str):
+        # Catalog words get deletes up to max_distance: the query word's own
+        # length sets the tolerance, so a long misspelling of a short title
+        # word must still meet it
+        codes = self.vocab[word]
+        if not codes:
+            for variant in self._variants(word, self.max_distance):
+                self.deletes[variant].add(word)
+        codes.add(code)
+
+    def _remove_word(self, word: str, code: str):
+        codes = self.vocab.get(word)
+        if not codes:
+            return
+        codes.discard(code)
+        if codes:
+            return
+        del self.vocab[word]
+        for variant in self._variants(word, self.max_distance):
+            words = self.deletes.get(variant)
+            if words:
+                words.discard(word)
+                if not words:
+                    del self.deletes[variant]
+
+    # Updates
+    def add(self, code: str, title: str = None, parts: int = None):
+        """Insert or replace a movie"""
+        code = code.lower().strip()
+        old = self.docs.get(code)
+        if old:
+            title = title if title is not None else old["title"]
+            parts = parts if parts is not None else old["parts"]
+            self.remove(code)
+
+        title = title or code.replace("_", " ").title()
+        self.version += 1
+        self.docs[code] = {"code": code, "title": title, "parts": parts or 1}
+        norm_title = normalize_name(title)
+        self.texts[code] = (code, norm_title)
+        for term in self._terms(code, norm_title):
+            self.postings[term].add(code)
+        for word in self._words(code, norm_title):
+            self._add_word(word, code)
+
+    def remove(self, code: str):
+        """Drop a movie from the index"""
+        code = code.lower().strip()
+        if code not in self.docs:
+            return
+        norm_code, norm_title = self.texts.pop(code)
+        del self.docs[code]
+        self.version += 1
+        for term in self._terms(norm_code, norm_title):
+            codes = self.postings.get(term)
+            if codes:
+                codes.discard(code)
+                if not codes:
+                    del self.postings[term]
+        for word in self._words(norm_code, norm_title):
+            self._remove_word(word, code)
+
+    def load(self, movies: list):
+        """Rebuild the whole index"""
+        self.docs.clear()
+        self.texts.clear()
+        self.postings.clear()
+        self.vocab.clear()
+        self.deletes.clear()
+        for m in movies:
+            if m.get("code"):
+                self.add(m["code"], m.get("title"), m.get("parts"))
+        self.version += 1
+        self.ready = True
+        logger.info(
+            f"Search index loaded: {len(self.docs)} movies, {len(self.postings)} terms, "
+            f"{len(self.deletes)} fuzzy keys"
+        )
+
+    # Queries
+    def _candidates(self, words: list) -> set:
+        result = None
+        for word in words:
+            if len(word) < self.ngram:
+                # Shorter than one gram - scan the (small) text table
+                pool = self.texts.keys() if result is None else result
+            else:
+                pool = None
+                for gram in self._grams(word):
+                    codes = self.postings.get(gram, set())
+                    pool = set(codes) if pool is None else pool & codes
+                    if not pool:
+                        return set()
+            # Grams can match out of order, so verify the substring
+            matched = {c for c in pool if word in self.texts[c][0] or word in self.texts[c][1]}
+            result = matched if result is None else result & matched
+            if not result:
+                return set()
+        return result or set()
+
+    def _score(self, query: str, words: list, code: str) -> float:
+        norm_code, norm_title = self.texts[code]
+        title_words = norm_title.split()
+        score = 0.0
+        if query == norm_code:
+            score += 100
+        elif norm_code.startswith(query):
+            score += 50
+        if query == norm_title:
+            score += 80
+        elif norm_title.startswith(query):
+            score += 40
+        if query in norm_code or query in norm_title:
+            score += 20
+        score += 10 * sum(1 for w in words if w in title_words)
+        # Prefer tighter matches
+        return score - len(norm_title) / 100
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Ranked top matches for a normalized query"""
+        query = query.lower().strip()
+        words = query.split()
+        if not words:
+            return []
+
+        ranked = sorted(
+            self._candidates(words),
+            key=lambda c: self._score(query, words, c),
+            reverse=True
+        )
+        return [dict(self.docs[c]) for c in ranked[:limit]]
+
+    def browse(self, limit: int = 200) -> list:
+        """First movies by title, for an empty query"""
+        codes = heapq.nsmallest(limit, self.docs, key=lambda c: self.texts[c][1])
+        return [dict(self.docs[c]) for c in codes]
+
+    def _corrections(self, word: str, deadline: float) -> dict:
+        """Catalog words within edit distance of `word` -> distance"""
+        limit = self._distance_for(word)
+        if word in self.vocab:
+            return {word: 0}
+        if not limit:
+            return {}
+
+        found, seen = {}, set()
+        for variant in self._variants(word, limit):
+            for candidate in self.deletes.get(variant, ()):
+                if candidate in seen or abs(len(candidate) - len(word)) > limit:
+                    continue
+                seen.add(candidate)
+                dist = edit_distance(word, candidate, limit)
+                if dist <= limit:
+                    found[candidate] = dist
+                if len(seen) % 8 == 0 and time.perf_counter() > deadline:
+                    return found
+        return found
+
+    def _trigram_similarity(self, a: str, b: str) -> float:
+        ga, gb = self._grams(a), self._grams(b)
+        return len(ga & gb) / len(ga | gb) if ga and gb else 0.0
+
+    def suggest(self, query: str, limit: int = 10) -> list:
+        """Typo-tolerant matches, best first; empty if nothing is close enough.
+
+        Each query word is corrected to nearby catalog words; movies score by
+        how many words they match (and how closely) plus trigram similarity
+        of the whole query to the title. Gives up after `budget_ms`.
+        """
+        query = query.lower().strip()
+        words = query.split()
+        if not words:
+            return []
+
+        deadline = time.perf_counter() + self.budget
+        scores = defaultdict(float)
+        for word in words:
+            best = {}
+            for candidate, dist in self._corrections(word, deadline).items():
+                weight = 1 - dist / max(len(word), len(candidate))
+                for code in self.vocab.get(candidate, ()):
+                    best[code] = max(best.get(code, 0.0), weight)
+            for code, weight in best.items():
+                scores[code] += weight
+            if time.perf_counter() > deadline:
+                logger.debug(f"Fuzzy search over budget for {query!r}")
+                break
+
+        # Rerank only the best word matches (shorter titles first on ties)
+        shortlist = heapq.nlargest(limit * 4, scores, key=lambda c: (scores[c], -len(self.texts[c][1])))
+        ranked = sorted(
+            shortlist,
+            key=lambda c: scores[c] + self._trigram_similarity(query, self.texts[c][1]),
+            reverse=True
+        )
+        return [dict(self.docs[c]) for c in ranked[:limit]]
+
+
+# Global instance
+search_index = SearchIndex(max_distance=Config.SEARCH_MAX_TYPOS, budget_ms=Config.SEARCH_FUZZY_BUDGET_MS)
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Closed -> open after N bad calls -> half-open probe -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        # Half-open: let exactly one probe through
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Shortener circuit closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def release_probe(self):
+        """A call that ended with no verdict (cancelled): let the next one probe"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Shortener circuit open after {self.failures} bad calls")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class Shortener:
+    """Bounded, hedged and circuit-broken calls to the link shortener"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 20,
+        timeout: float = 10,
+        slow_after: float = 5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        hedge: bool = True
+    ):
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.timeout = timeout
+        self.slow_after = slow_after
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latencies = deque(maxlen=200)
+        self.calls = 0
+        self.fallbacks = 0
+        self.hedged = 0
+
+    def p95(self) -> float:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    async def shorten(self, url: str, fetch) -> str:
+        """Return fetch(url), or the raw url when the upstream is unhealthy.
+
+        A free slot is waited for up to the timeout; the raw url is only
+        served when the breaker is open or no slot frees up in time.
+        """
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.fallbacks += 1
+            return url
+
+        try:
+            if not self.breaker.allow():
+                self.fallbacks += 1
+                return url
+
+            self.calls += 1
+            start = time.monotonic()
+            try:
+                result = await self._call(url, fetch)
+            except asyncio.CancelledError:
+                # Otherwise a cancelled half-open probe would block every later call
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                logger.error(f"Shortener error: {e!r}")
+                self.breaker.record_failure()
+                self.fallbacks += 1
+                return url
+
+            elapsed = time.monotonic() - start
+            self.latencies.append(elapsed)
+            if elapsed > self.slow_after:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return result
+        finally:
+            self.semaphore.release()
+
+    async def _call(self, url: str, fetch) -> str:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        tasks = {asyncio.ensure_future(fetch(url))}
+        error = None
+        try:
+            # Hedge: fire a second request once the first is slower than p95
+            hedge_after = self.p95() if self.hedge else None
+            if hedge_after is not None and hedge_after < self.timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    self.hedged += 1
+                    tasks.add(asyncio.ensure_future(fetch(url)))
+
+            while tasks:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error or asyncio.TimeoutError(f"no response in {self.timeout}s")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "fallbacks": self.fallbacks,
+            "hedged": self.hedged,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None
+        }
+
+
+# Global instance
+shortener = Shortener(
+    max_in_flight=Config.SHORTENER_MAX_IN_FLIGHT,
+    timeout=Config.SHORTENER_TIMEOUT,
+    slow_after=Config.SHORTENER_SLOW_AFTER,
+    failure_threshold=Config.SHORTENER_FAILURE_THRESHOLD,
+    reset_timeout=Config.SHORTENER_RESET_TIMEOUT,
+    hedge=Config.SHORTENER_HEDGE
+)
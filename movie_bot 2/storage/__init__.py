@@ -0,0 +1,17 @@
+from config import Config
+from storage.base import Storage
+
+
+def create_storage() -> Storage:
+    """Build the backend selected by Config.STORAGE_BACKEND"""
+    backend = Config.STORAGE_BACKEND
+    if backend == "mongo":
+        from storage.mongo import MongoStorage
+        return MongoStorage(Config.MONGO_DB_URL, Config.DB_NAME)
+    if backend == "sqlite":
+        from storage.sqlite import SQLiteStorage
+        return SQLiteStorage(Config.SQLITE_PATH)
+    if backend == "memory":
+        from storage.memory import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
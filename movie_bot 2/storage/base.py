@@ -0,0 +1,147 @@
+class Storage:
+    """Backend interface for movie, user, token and broadcast data.
+
+    Caching and the search index live in database.Database on top of this;
+    backends only move documents in and out of their store.
+    """
+
+    name = "base"
+
+    # Lifecycle
+    async def setup(self):
+        """Create tables/indexes and run migrations"""
+
+    async def close(self):
+        pass
+
+    # Movie operations
+    async def upsert_movie(self, code: str, data: dict):
+        """Merge `data` into the movie with this code, creating it if needed"""
+        raise NotImplementedError
+
+    async def update_movie(self, code: str, fields: dict) -> bool:
+        """Set fields on an existing movie; False if there is none"""
+        raise NotImplementedError
+
+    async def find_movie(self, code: str) -> dict:
+        raise NotImplementedError
+
+    async def find_movies(self, codes: list) -> list:
+        """Every existing movie among `codes`, in one round trip"""
+        raise NotImplementedError
+
+    async def bulk_upsert_movies(self, docs: list):
+        """Merge each document into its movie (by code) in one unordered batch"""
+        raise NotImplementedError
+
+    async def search_movies(self, query: str, limit: int = 10) -> list:
+        """Backend-native search, used while the in-memory index is cold"""
+        raise NotImplementedError
+
+    async def delete_movie(self, code: str) -> bool:
+        raise NotImplementedError
+
+    async def set_movie_info(self, code: str, info: dict, fetched_at: float):
+        raise NotImplementedError
+
+    async def iter_movie_info(self, fresh_after: float):
+        """Yield (title, info) for movies with TMDB info newer than fresh_after"""
+        raise NotImplementedError
+        yield
+
+    async def stale_movie_codes(self, older_than: float, limit: int = 100) -> list:
+        """Codes of movies whose TMDB info is missing or fetched before older_than"""
+        raise NotImplementedError
+
+    async def movie_summaries(self) -> list:
+        """Every movie as {code, title, parts}"""
+        raise NotImplementedError
+
+    async def get_all_movies(self, limit: int = 1000) -> list:
+        raise NotImplementedError
+
+    async def count_movies(self, exact: bool = False) -> int:
+        raise NotImplementedError
+
+    async def list_movies_page(self, after: str = None, before: str = None, limit: int = 20) -> tuple:
+        """Keyset page of {code, title, parts} ordered by code.
+
+        Returns (movies, has_more) where has_more refers to the direction
+        being paged in.
+        """
+        raise NotImplementedError
+
+    # User operations
+    async def upsert_users(self, users: dict):
+        """Upsert {user_id: username} in one batch"""
+        raise NotImplementedError
+
+    async def count_users(self, estimated: bool = False) -> int:
+        raise NotImplementedError
+
+    async def get_all_users(self) -> list:
+        raise NotImplementedError
+
+    async def iter_user_ids(self, after_id=None, batch_size: int = 500):
+        """Yield (checkpoint id, user_id) in a stable order after a checkpoint"""
+        raise NotImplementedError
+        yield
+
+    # Broadcast operations
+    async def create_broadcast(self, data: dict):
+        raise NotImplementedError
+
+    async def update_broadcast(self, broadcast_id, fields: dict):
+        raise NotImplementedError
+
+    async def get_unfinished_broadcasts(self) -> list:
+        raise NotImplementedError
+
+    # Token operations
+    async def create_token(self, user_id: int, movie_code: str, part: int = 1) -> str:
+        raise NotImplementedError
+
+    async def verify_token(self, token: str, user_id: int, ttl: int) -> dict:
+        """Mark an unused token younger than ttl seconds as used and return it"""
+        raise NotImplementedError
+
+    async def cleanup_tokens(self, older_than: int):
+        raise NotImplementedError
+
+    # Background jobs
+    async def create_job(self, doc: dict):
+        """Insert a job and return its id.
+
+        A job with an `active_key` is only inserted if no other queued or
+        running job holds the same key; otherwise returns None.
+        """
+        raise NotImplementedError
+
+    async def claim_job(self, worker: str, now: float, lease: float) -> dict:
+        """Lease the next runnable job to `worker`.
+
+        Runnable means queued with run_at <= now, or running with an expired
+        lease. Highest priority first, then oldest run_at. Increments
+        attempts. Returns the claimed job or None.
+        """
+        raise NotImplementedError
+
+    async def update_job(self, job_id, fields: dict, worker: str = None) -> bool:
+        """Apply fields (None clears a field). With `worker`, only while that
+        worker still holds the job's lease."""
+        raise NotImplementedError
+
+    async def get_job(self, job_id) -> dict:
+        raise NotImplementedError
+
+    async def list_jobs(self, status: str = None, limit: int = 20) -> list:
+        """Newest first"""
+        raise NotImplementedError
+
+    # Job state (checkpoints for long-running admin jobs)
+    async def get_state(self, key: str) -> dict:
+        raise NotImplementedError
+
+    async def set_state(self, key: str, value: dict):
+        """Store `value` under `key`; None removes it"""
+        raise NotImplementedError
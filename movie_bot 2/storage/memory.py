@@ -0,0 +1,212 @@
+import asyncio
+import copy
+import itertools
+import secrets
+import time
+from storage.base import Storage
+
+
+class MemoryStorage(Storage):
+    """Process-local dicts, for tests and benchmarks.
+
+    `latency` adds a sleep to every call to simulate a network database.
+    """
+
+    name = "memory"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.movies = {}        # code -> document
+        self.users = {}         # user_id -> document
+        self.tokens = {}        # token -> document
+        self.broadcasts = {}    # id -> document
+        self.state = {}         # key -> value
+        self.jobs = {}          # id -> document
+        self._ids = itertools.count(1)
+
+    async def _io(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @staticmethod
+    def _summary(m: dict) -> dict:
+        return {"code": m["code"], "title": m.get("title"), "parts": m.get("parts")}
+
+    # Movie operations
+    async def upsert_movie(self, code: str, data: dict):
+        await self._io()
+        self.movies.setdefault(code, {"code": code}).update(copy.deepcopy(data))
+
+    async def update_movie(self, code: str, fields: dict) -> bool:
+        await self._io()
+        if code not in self.movies:
+            return False
+        self.movies[code].update(copy.deepcopy(fields))
+        return True
+
+    async def find_movie(self, code: str) -> dict:
+        await self._io()
+        return copy.deepcopy(self.movies.get(code))
+
+    async def find_movies(self, codes: list) -> list:
+        await self._io()
+        return [copy.deepcopy(self.movies[c]) for c in codes if c in self.movies]
+
+    async def bulk_upsert_movies(self, docs: list):
+        await self._io()
+        for doc in docs:
+            self.movies.setdefault(doc["code"], {"code": doc["code"]}).update(copy.deepcopy(doc))
+
+    async def search_movies(self, query: str, limit: int = 10) -> list:
+        await self._io()
+        query = query.lower()
+        found = [
+            m for m in self.movies.values()
+            if query in m["code"] or query in (m.get("title") or "").lower()
+        ]
+        return copy.deepcopy(found[:limit])
+
+    async def delete_movie(self, code: str) -> bool:
+        await self._io()
+        return self.movies.pop(code, None) is not None
+
+    async def set_movie_info(self, code: str, info: dict, fetched_at: float):
+        await self._io()
+        if code in self.movies:
+            self.movies[code].update({"tmdb": info, "tmdb_at": fetched_at})
+
+    async def iter_movie_info(self, fresh_after: float):
+        for m in list(self.movies.values()):
+            if m.get("tmdb") and m.get("tmdb_at", 0) >= fresh_after:
+                yield m["title"], m["tmdb"]
+
+    async def stale_movie_codes(self, older_than: float, limit: int = 100) -> list:
+        return [c for c, m in self.movies.items() if m.get("tmdb_at", 0) < older_than][:limit]
+
+    async def movie_summaries(self) -> list:
+        return [self._summary(m) for m in self.movies.values()]
+
+    async def get_all_movies(self, limit: int = 1000) -> list:
+        await self._io()
+        return copy.deepcopy(list(self.movies.values())[:limit])
+
+    async def count_movies(self, exact: bool = False) -> int:
+        return len(self.movies)
+
+    async def list_movies_page(self, after: str = None, before: str = None, limit: int = 20) -> tuple:
+        await self._io()
+        codes = sorted(self.movies)
+        if before is not None:
+            page = [c for c in codes if c < before][-(limit + 1):]
+            has_more, page = len(page) > limit, page[-limit:]
+        else:
+            page = [c for c in codes if after is None or c > after][:limit + 1]
+            has_more, page = len(page) > limit, page[:limit]
+        return [self._summary(self.movies[c]) for c in page], has_more
+
+    # User operations
+    async def upsert_users(self, users: dict):
+        await self._io()
+        for user_id, username in users.items():
+            self.users[user_id] = {"user_id": user_id, "username": username}
+
+    async def count_users(self, estimated: bool = False) -> int:
+        return len(self.users)
+
+    async def get_all_users(self) -> list:
+        return copy.deepcopy(list(self.users.values()))
+
+    async def iter_user_ids(self, after_id=None, batch_size: int = 500):
+        for user_id in sorted(self.users):
+            if after_id is None or user_id > after_id:
+                yield user_id, user_id
+
+    # Broadcast operations
+    async def create_broadcast(self, data: dict):
+        broadcast_id = next(self._ids)
+        self.broadcasts[broadcast_id] = dict(data, _id=broadcast_id)
+        return broadcast_id
+
+    async def update_broadcast(self, broadcast_id, fields: dict):
+        await self._io()
+        self.broadcasts[broadcast_id].update(fields)
+
+    async def get_unfinished_broadcasts(self) -> list:
+        return [dict(b) for b in self.broadcasts.values() if b["status"] in ("running", "paused")]
+
+    # Token operations
+    async def create_token(self, user_id: int, movie_code: str, part: int = 1) -> str:
+        await self._io()
+        token = secrets.token_urlsafe(16)
+        self.tokens[token] = {
+            "token": token,
+            "user_id": user_id,
+            "movie_code": movie_code,
+            "part": part,
+            "created_at": time.time(),
+            "used": False
+        }
+        return token
+
+    async def verify_token(self, token: str, user_id: int, ttl: int) -> dict:
+        await self._io()
+        doc = self.tokens.get(token)
+        if not doc or doc["user_id"] != user_id or doc["used"] or doc["created_at"] < time.time() - ttl:
+            return None
+        doc["used"] = True
+        return dict(doc)
+
+    async def cleanup_tokens(self, older_than: int):
+        expired = time.time() - older_than
+        for token in [t for t, d in self.tokens.items() if d["created_at"] < expired]:
+            del self.tokens[token]
+
+    # Background jobs
+    async def create_job(self, doc: dict):
+        key = doc.get("active_key")
+        if key and any(j.get("active_key") == key for j in self.jobs.values()):
+            return None
+        job_id = str(next(self._ids))
+        self.jobs[job_id] = dict(copy.deepcopy(doc), id=job_id)
+        return job_id
+
+    async def claim_job(self, worker: str, now: float, lease: float) -> dict:
+        runnable = [
+            j for j in self.jobs.values()
+            if (j["status"] == "queued" and j["run_at"] <= now)
+            or (j["status"] == "running" and j["lease_until"] < now)
+        ]
+        if not runnable:
+            return None
+        job = min(runnable, key=lambda j: (-j["priority"], j["run_at"]))
+        job.update(status="running", worker=worker, lease_until=now + lease, started_at=now)
+        job["attempts"] = job.get("attempts", 0) + 1
+        return copy.deepcopy(job)
+
+    async def update_job(self, job_id, fields: dict, worker: str = None) -> bool:
+        job = self.jobs.get(str(job_id))
+        if not job or (worker and (job.get("worker") != worker or job["status"] != "running")):
+            return False
+        for key, value in fields.items():
+            if value is None:
+                job.pop(key, None)
+            else:
+                job[key] = copy.deepcopy(value)
+        return True
+
+    async def get_job(self, job_id) -> dict:
+        return copy.deepcopy(self.jobs.get(str(job_id)))
+
+    async def list_jobs(self, status: str = None, limit: int = 20) -> list:
+        jobs = [j for j in reversed(list(self.jobs.values())) if not status or j["status"] == status]
+        return copy.deepcopy(jobs[:limit])
+
+    # Job state
+    async def get_state(self, key: str) -> dict:
+        return copy.deepcopy(self.state.get(key))
+
+    async def set_state(self, key: str, value: dict):
+        if value is None:
+            self.state.pop(key, None)
+        else:
+            self.state[key] = copy.deepcopy(value)
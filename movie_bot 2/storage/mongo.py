@@ -0,0 +1,264 @@
+import re
+import secrets
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from storage.base import Storage
+
+
+class MongoStorage(Storage):
+    """MongoDB through Motor"""
+
+    name = "mongo"
+
+    def __init__(self, url: str, db_name: str):
+        self.client = AsyncIOMotorClient(url)
+        self.db = self.client[db_name]
+        self.movies = self.db["movies"]
+        self.users = self.db["users"]
+        self.tokens = self.db["tokens"]
+        self.broadcasts = self.db["broadcasts"]
+        self.meta = self.db["meta"]
+        self.jobs = self.db["jobs"]
+
+    async def setup(self):
+        from schema import SchemaManager
+        await SchemaManager(self).bootstrap()
+
+    async def close(self):
+        self.client.close()
+
+    # Movie operations
+    async def upsert_movie(self, code: str, data: dict):
+        await self.movies.update_one({"code": code}, {"$set": data}, upsert=True)
+
+    async def update_movie(self, code: str, fields: dict) -> bool:
+        result = await self.movies.update_one({"code": code}, {"$set": fields})
+        return result.matched_count > 0
+
+    async def find_movie(self, code: str) -> dict:
+        return await self.movies.find_one({"code": code})
+
+    async def find_movies(self, codes: list) -> list:
+        return await self.movies.find({"code": {"$in": list(codes)}}).to_list(length=None)
+
+    async def bulk_upsert_movies(self, docs: list):
+        if not docs:
+            return
+        await self.movies.bulk_write(
+            [
+                UpdateOne(
+                    {"code": doc["code"]},
+                    {"$set": {k: v for k, v in doc.items() if k != "_id"}},
+                    upsert=True
+                )
+                for doc in docs
+            ],
+            ordered=False
+        )
+
+    async def search_movies(self, query: str, limit: int = 10) -> list:
+        pattern = re.escape(query)
+        cursor = self.movies.find({
+            "$or": [
+                {"code": {"$regex": pattern, "$options": "i"}},
+                {"title": {"$regex": pattern, "$options": "i"}}
+            ]
+        }).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def delete_movie(self, code: str) -> bool:
+        result = await self.movies.delete_one({"code": code})
+        return result.deleted_count > 0
+
+    async def set_movie_info(self, code: str, info: dict, fetched_at: float):
+        await self.movies.update_one({"code": code}, {"$set": {"tmdb": info, "tmdb_at": fetched_at}})
+
+    async def iter_movie_info(self, fresh_after: float):
+        cursor = self.movies.find(
+            {"tmdb": {"$ne": None}, "tmdb_at": {"$gte": fresh_after}},
+            {"_id": 0, "title": 1, "tmdb": 1}
+        )
+        async for m in cursor:
+            yield m["title"], m["tmdb"]
+
+    async def stale_movie_codes(self, older_than: float, limit: int = 100) -> list:
+        cursor = self.movies.find(
+            {"$or": [{"tmdb_at": {"$lt": older_than}}, {"tmdb_at": None}]},
+            {"_id": 0, "code": 1}
+        ).limit(limit)
+        return [m["code"] async for m in cursor]
+
+    async def movie_summaries(self) -> list:
+        cursor = self.movies.find({}, {"_id": 0, "code": 1, "title": 1, "parts": 1})
+        return await cursor.to_list(length=None)
+
+    async def get_all_movies(self, limit: int = 1000) -> list:
+        cursor = self.movies.find({})
+        return await cursor.to_list(length=limit)
+
+    async def count_movies(self, exact: bool = False) -> int:
+        if exact:
+            return await self.movies.count_documents({})
+        return await self.movies.estimated_document_count()
+
+    async def list_movies_page(self, after: str = None, before: str = None, limit: int = 20) -> tuple:
+        projection = {"_id": 0, "code": 1, "title": 1, "parts": 1}
+        if before is not None:
+            cursor = self.movies.find({"code": {"$lt": before}}, projection).sort("code", -1)
+        else:
+            query = {"code": {"$gt": after}} if after is not None else {}
+            cursor = self.movies.find(query, projection).sort("code", 1)
+
+        movies = await cursor.limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(movies) > limit
+        movies = movies[:limit]
+        if before is not None:
+            movies.reverse()
+        return movies, has_more
+
+    # User operations
+    async def upsert_users(self, users: dict):
+        if not users:
+            return
+        await self.users.bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user_id},
+                    {"$set": {"user_id": user_id, "username": username}},
+                    upsert=True
+                )
+                for user_id, username in users.items()
+            ],
+            ordered=False
+        )
+
+    async def count_users(self, estimated: bool = False) -> int:
+        if estimated:
+            return await self.users.estimated_document_count()
+        return await self.users.count_documents({})
+
+    async def get_all_users(self) -> list:
+        cursor = self.users.find({})
+        return await cursor.to_list(length=100000)
+
+    async def iter_user_ids(self, after_id=None, batch_size: int = 500):
+        query = {"_id": {"$gt": after_id}} if after_id else {}
+        cursor = self.users.find(query, {"user_id": 1}).sort("_id", 1).batch_size(batch_size)
+        async for u in cursor:
+            yield u["_id"], u["user_id"]
+
+    # Broadcast operations
+    async def create_broadcast(self, data: dict):
+        result = await self.broadcasts.insert_one(data)
+        return result.inserted_id
+
+    async def update_broadcast(self, broadcast_id, fields: dict):
+        await self.broadcasts.update_one({"_id": broadcast_id}, {"$set": fields})
+
+    async def get_unfinished_broadcasts(self) -> list:
+        cursor = self.broadcasts.find({"status": {"$in": ["running", "paused"]}}).sort("_id", 1)
+        return await cursor.to_list(length=10)
+
+    # Token operations
+    async def create_token(self, user_id: int, movie_code: str, part: int = 1) -> str:
+        token = secrets.token_urlsafe(16)
+        await self.tokens.insert_one({
+            "token": token,
+            "user_id": user_id,
+            "movie_code": movie_code,
+            "part": part,
+            "created_at": datetime.now(timezone.utc),
+            "used": False
+        })
+        return token
+
+    async def verify_token(self, token: str, user_id: int, ttl: int) -> dict:
+        valid_after = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+        return await self.tokens.find_one_and_update(
+            {
+                "token": token,
+                "user_id": user_id,
+                "used": False,
+                "created_at": {"$gte": valid_after}
+            },
+            {"$set": {"used": True}}
+        )
+
+    async def cleanup_tokens(self, older_than: int):
+        # Normally a no-op: the created_at TTL index expires tokens
+        expired = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+        await self.tokens.delete_many({"created_at": {"$lt": expired}})
+
+    # Background jobs
+    @staticmethod
+    def _job_id(job_id):
+        try:
+            return ObjectId(str(job_id))
+        except InvalidId:
+            return None
+
+    @staticmethod
+    def _job(doc: dict) -> dict:
+        if doc:
+            doc["id"] = str(doc.pop("_id"))
+        return doc
+
+    async def create_job(self, doc: dict):
+        doc = {k: v for k, v in doc.items() if v is not None}
+        try:
+            result = await self.jobs.insert_one(doc)
+        except DuplicateKeyError:
+            return None
+        return str(result.inserted_id)
+
+    async def claim_job(self, worker: str, now: float, lease: float) -> dict:
+        doc = await self.jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                {"status": "running", "lease_until": {"$lt": now}}
+            ]},
+            {
+                "$set": {"status": "running", "worker": worker, "lease_until": now + lease, "started_at": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", DESCENDING), ("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return self._job(doc)
+
+    async def update_job(self, job_id, fields: dict, worker: str = None) -> bool:
+        query = {"_id": self._job_id(job_id)}
+        if worker:
+            query.update(worker=worker, status="running")
+        update = {}
+        cleared = {k: "" for k, v in fields.items() if v is None}
+        if cleared:
+            update["$unset"] = cleared
+        kept = {k: v for k, v in fields.items() if v is not None}
+        if kept:
+            update["$set"] = kept
+        result = await self.jobs.update_one(query, update)
+        return result.matched_count > 0
+
+    async def get_job(self, job_id) -> dict:
+        return self._job(await self.jobs.find_one({"_id": self._job_id(job_id)}))
+
+    async def list_jobs(self, status: str = None, limit: int = 20) -> list:
+        query = {"status": status} if status else {}
+        cursor = self.jobs.find(query, {"payload": 0, "result": 0}).sort("_id", DESCENDING).limit(limit)
+        return [self._job(doc) async for doc in cursor]
+
+    # Job state
+    async def get_state(self, key: str) -> dict:
+        doc = await self.meta.find_one({"_id": f"state:{key}"})
+        return doc["value"] if doc else None
+
+    async def set_state(self, key: str, value: dict):
+        if value is None:
+            await self.meta.delete_one({"_id": f"state:{key}"})
+        else:
+            await self.meta.update_one({"_id": f"state:{key}"}, {"$set": {"value": value}}, upsert=True)
@@ -0,0 +1,427 @@
+import asyncio
+import json
+import secrets
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from storage.base import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    code TEXT PRIMARY KEY,
+    title TEXT,
+    parts INTEGER,
+    tmdb_at REAL,
+    doc TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(code, title, tokenize='trigram');
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    movie_code TEXT NOT NULL,
+    part INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    used INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tokens_created_at ON tokens (created_at);
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    lease_until REAL,
+    worker TEXT,
+    active_key TEXT UNIQUE,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (status, priority DESC, run_at);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteStorage(Storage):
+    """Embedded SQLite (WAL, FTS5 trigram search) behind a single worker thread.
+
+    One thread owns the connection, so every call is serialized and each
+    read-modify-write below runs without interleaving.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.conn = None
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def _connect(self):
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self.conn = conn
+        return self.conn
+
+    def _query(self, sql: str, params=()) -> list:
+        return self._connect().execute(sql, params).fetchall()
+
+    def _write(self, fn, *args):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def setup(self):
+        await self._run(self._connect)
+
+    async def close(self):
+        def close():
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+        await self._run(close)
+        self.executor.shutdown(wait=True)
+
+    # Movie operations
+    @staticmethod
+    def _upsert_movie(conn, code: str, data: dict):
+        row = conn.execute("SELECT doc FROM movies WHERE code = ?", (code,)).fetchone()
+        doc = json.loads(row["doc"]) if row else {}
+        doc.update(data)
+        doc["code"] = code
+        conn.execute(
+            "INSERT INTO movies (code, title, parts, tmdb_at, doc) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(code) DO UPDATE SET title = excluded.title, parts = excluded.parts, "
+            "tmdb_at = excluded.tmdb_at, doc = excluded.doc",
+            (code, doc.get("title"), doc.get("parts"), doc.get("tmdb_at"), json.dumps(doc))
+        )
+        conn.execute("DELETE FROM movies_fts WHERE code = ?", (code,))
+        conn.execute("INSERT INTO movies_fts (code, title) VALUES (?, ?)", (code, (doc.get("title") or "").lower()))
+
+    async def upsert_movie(self, code: str, data: dict):
+        await self._run(self._write, self._upsert_movie, code, data)
+
+    @classmethod
+    def _update_movie(cls, conn, code: str, fields: dict) -> bool:
+        if not conn.execute("SELECT 1 FROM movies WHERE code = ?", (code,)).fetchone():
+            return False
+        cls._upsert_movie(conn, code, fields)
+        return True
+
+    async def update_movie(self, code: str, fields: dict) -> bool:
+        return await self._run(self._write, self._update_movie, code, fields)
+
+    async def find_movie(self, code: str) -> dict:
+        rows = await self._run(self._query, "SELECT doc FROM movies WHERE code = ?", (code,))
+        return json.loads(rows[0]["doc"]) if rows else None
+
+    async def find_movies(self, codes: list) -> list:
+        codes = list(codes)
+        docs = []
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(codes), 500):
+            chunk = codes[i:i + 500]
+            rows = await self._run(
+                self._query,
+                f"SELECT doc FROM movies WHERE code IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            docs.extend(json.loads(r["doc"]) for r in rows)
+        return docs
+
+    @classmethod
+    def _bulk_upsert_movies(cls, conn, docs: list):
+        for doc in docs:
+            cls._upsert_movie(conn, doc["code"], doc)
+
+    async def bulk_upsert_movies(self, docs: list):
+        if docs:
+            await self._run(self._write, self._bulk_upsert_movies, docs)
+
+    async def search_movies(self, query: str, limit: int = 10) -> list:
+        query = query.lower()
+        if len(query) >= 3:
+            # Trigram FTS: a quoted phrase matches substrings, ranked by bm25
+            sql = (
+                "SELECT m.doc FROM movies_fts f JOIN movies m ON m.code = f.code "
+                "WHERE movies_fts MATCH ? ORDER BY f.rank LIMIT ?"
+            )
+            params = ('"' + query.replace('"', '""') + '"', limit)
+        else:
+            sql = "SELECT doc FROM movies WHERE code LIKE ? OR lower(title) LIKE ? LIMIT ?"
+            params = (f"%{query}%", f"%{query}%", limit)
+        rows = await self._run(self._query, sql, params)
+        return [json.loads(r["doc"]) for r in rows]
+
+    @staticmethod
+    def _delete_movie(conn, code: str) -> bool:
+        deleted = conn.execute("DELETE FROM movies WHERE code = ?", (code,)).rowcount
+        conn.execute("DELETE FROM movies_fts WHERE code = ?", (code,))
+        return deleted > 0
+
+    async def delete_movie(self, code: str) -> bool:
+        return await self._run(self._write, self._delete_movie, code)
+
+    async def set_movie_info(self, code: str, info: dict, fetched_at: float):
+        # Existence check and write in one transaction, so a concurrent delete can't be undone
+        await self.update_movie(code, {"tmdb": info, "tmdb_at": fetched_at})
+
+    async def iter_movie_info(self, fresh_after: float):
+        rows = await self._run(self._query, "SELECT doc FROM movies WHERE tmdb_at >= ?", (fresh_after,))
+        for r in rows:
+            doc = json.loads(r["doc"])
+            if doc.get("tmdb"):
+                yield doc["title"], doc["tmdb"]
+
+    async def stale_movie_codes(self, older_than: float, limit: int = 100) -> list:
+        rows = await self._run(
+            self._query,
+            "SELECT code FROM movies WHERE tmdb_at IS NULL OR tmdb_at < ? LIMIT ?",
+            (older_than, limit)
+        )
+        return [r["code"] for r in rows]
+
+    async def movie_summaries(self) -> list:
+        rows = await self._run(self._query, "SELECT code, title, parts FROM movies")
+        return [dict(r) for r in rows]
+
+    async def get_all_movies(self, limit: int = 1000) -> list:
+        rows = await self._run(self._query, "SELECT doc FROM movies LIMIT ?", (limit,))
+        return [json.loads(r["doc"]) for r in rows]
+
+    async def count_movies(self, exact: bool = False) -> int:
+        rows = await self._run(self._query, "SELECT COUNT(*) AS n FROM movies")
+        return rows[0]["n"]
+
+    async def list_movies_page(self, after: str = None, before: str = None, limit: int = 20) -> tuple:
+        if before is not None:
+            sql = "SELECT code, title, parts FROM movies WHERE code < ? ORDER BY code DESC LIMIT ?"
+            params = (before, limit + 1)
+        elif after is not None:
+            sql = "SELECT code, title, parts FROM movies WHERE code > ? ORDER BY code LIMIT ?"
+            params = (after, limit + 1)
+        else:
+            sql = "SELECT code, title, parts FROM movies ORDER BY code LIMIT ?"
+            params = (limit + 1,)
+
+        movies = [dict(r) for r in await self._run(self._query, sql, params)]
+        has_more = len(movies) > limit
+        movies = movies[:limit]
+        if before is not None:
+            movies.reverse()
+        return movies, has_more
+
+    # User operations
+    @staticmethod
+    def _upsert_users(conn, users: dict):
+        conn.executemany(
+            "INSERT INTO users (user_id, username) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET username = excluded.username",
+            list(users.items())
+        )
+
+    async def upsert_users(self, users: dict):
+        if users:
+            await self._run(self._write, self._upsert_users, users)
+
+    async def count_users(self, estimated: bool = False) -> int:
+        rows = await self._run(self._query, "SELECT COUNT(*) AS n FROM users")
+        return rows[0]["n"]
+
+    async def get_all_users(self) -> list:
+        rows = await self._run(self._query, "SELECT user_id, username FROM users")
+        return [dict(r) for r in rows]
+
+    async def iter_user_ids(self, after_id=None, batch_size: int = 500):
+        after = after_id if after_id is not None else -(2 ** 63)
+        while True:
+            rows = await self._run(
+                self._query,
+                "SELECT user_id FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                (after, batch_size)
+            )
+            for r in rows:
+                yield r["user_id"], r["user_id"]
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]["user_id"]
+
+    # Broadcast operations
+    @staticmethod
+    def _create_broadcast(conn, data: dict):
+        cur = conn.execute(
+            "INSERT INTO broadcasts (status, doc) VALUES (?, ?)",
+            (data.get("status", ""), json.dumps(data))
+        )
+        return cur.lastrowid
+
+    async def create_broadcast(self, data: dict):
+        return await self._run(self._write, self._create_broadcast, data)
+
+    @staticmethod
+    def _update_broadcast(conn, broadcast_id, fields: dict):
+        row = conn.execute("SELECT doc FROM broadcasts WHERE id = ?", (broadcast_id,)).fetchone()
+        if not row:
+            return
+        doc = json.loads(row["doc"])
+        doc.update(fields)
+        conn.execute(
+            "UPDATE broadcasts SET status = ?, doc = ? WHERE id = ?",
+            (doc.get("status", ""), json.dumps(doc), broadcast_id)
+        )
+
+    async def update_broadcast(self, broadcast_id, fields: dict):
+        await self._run(self._write, self._update_broadcast, broadcast_id, fields)
+
+    async def get_unfinished_broadcasts(self) -> list:
+        rows = await self._run(
+            self._query,
+            "SELECT id, doc FROM broadcasts WHERE status IN ('running', 'paused') ORDER BY id LIMIT 10"
+        )
+        return [dict(json.loads(r["doc"]), _id=r["id"]) for r in rows]
+
+    # Token operations
+    async def create_token(self, user_id: int, movie_code: str, part: int = 1) -> str:
+        token = secrets.token_urlsafe(16)
+        await self._run(
+            self._write,
+            lambda conn: conn.execute(
+                "INSERT INTO tokens (token, user_id, movie_code, part, created_at) VALUES (?, ?, ?, ?, ?)",
+                (token, user_id, movie_code, part, time.time())
+            )
+        )
+        return token
+
+    @staticmethod
+    def _verify_token(conn, token: str, user_id: int, ttl: int) -> dict:
+        row = conn.execute(
+            "SELECT * FROM tokens WHERE token = ? AND user_id = ? AND used = 0 AND created_at >= ?",
+            (token, user_id, time.time() - ttl)
+        ).fetchone()
+        if not row:
+            return None
+        conn.execute("UPDATE tokens SET used = 1 WHERE token = ?", (token,))
+        return dict(row)
+
+    async def verify_token(self, token: str, user_id: int, ttl: int) -> dict:
+        return await self._run(self._write, self._verify_token, token, user_id, ttl)
+
+    async def cleanup_tokens(self, older_than: int):
+        await self._run(
+            self._write,
+            lambda conn: conn.execute("DELETE FROM tokens WHERE created_at < ?", (time.time() - older_than,))
+        )
+
+    # Background jobs
+    JOB_COLUMNS = ("status", "priority", "run_at", "lease_until", "worker", "active_key")
+
+    @classmethod
+    def _save_job(cls, conn, job_id, doc: dict):
+        conn.execute(
+            f"UPDATE jobs SET {', '.join(c + ' = ?' for c in cls.JOB_COLUMNS)}, doc = ? WHERE id = ?",
+            [doc.get(c) for c in cls.JOB_COLUMNS] + [json.dumps(doc), job_id]
+        )
+
+    @classmethod
+    def _create_job(cls, conn, doc: dict):
+        doc = {k: v for k, v in doc.items() if v is not None}
+        try:
+            cur = conn.execute(
+                "INSERT INTO jobs (status, run_at, active_key, doc) VALUES (?, ?, ?, '{}')",
+                (doc["status"], doc["run_at"], doc.get("active_key"))
+            )
+        except sqlite3.IntegrityError:
+            return None
+        doc["id"] = str(cur.lastrowid)
+        cls._save_job(conn, cur.lastrowid, doc)
+        return doc["id"]
+
+    async def create_job(self, doc: dict):
+        return await self._run(self._write, self._create_job, doc)
+
+    @classmethod
+    def _claim_job(cls, conn, worker: str, now: float, lease: float) -> dict:
+        row = conn.execute(
+            "SELECT id, doc FROM jobs WHERE (status = 'queued' AND run_at <= ?) "
+            "OR (status = 'running' AND lease_until < ?) ORDER BY priority DESC, run_at LIMIT 1",
+            (now, now)
+        ).fetchone()
+        if not row:
+            return None
+        doc = json.loads(row["doc"])
+        doc.update(status="running", worker=worker, lease_until=now + lease, started_at=now)
+        doc["attempts"] = doc.get("attempts", 0) + 1
+        cls._save_job(conn, row["id"], doc)
+        return doc
+
+    async def claim_job(self, worker: str, now: float, lease: float) -> dict:
+        return await self._run(self._write, self._claim_job, worker, now, lease)
+
+    @classmethod
+    def _update_job(cls, conn, job_id, fields: dict, worker: str = None) -> bool:
+        row = conn.execute("SELECT doc FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return False
+        doc = json.loads(row["doc"])
+        if worker and (doc.get("worker") != worker or doc["status"] != "running"):
+            return False
+        for key, value in fields.items():
+            if value is None:
+                doc.pop(key, None)
+            else:
+                doc[key] = value
+        cls._save_job(conn, job_id, doc)
+        return True
+
+    async def update_job(self, job_id, fields: dict, worker: str = None) -> bool:
+        if not str(job_id).isdigit():
+            return False
+        return await self._run(self._write, self._update_job, int(job_id), fields, worker)
+
+    async def get_job(self, job_id) -> dict:
+        if not str(job_id).isdigit():
+            return None
+        rows = await self._run(self._query, "SELECT doc FROM jobs WHERE id = ?", (int(job_id),))
+        return json.loads(rows[0]["doc"]) if rows else None
+
+    async def list_jobs(self, status: str = None, limit: int = 20) -> list:
+        if status:
+            sql, params = "SELECT doc FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+        else:
+            sql, params = "SELECT doc FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+        return [json.loads(r["doc"]) for r in await self._run(self._query, sql, params)]
+
+    # Job state
+    async def get_state(self, key: str) -> dict:
+        rows = await self._run(self._query, "SELECT value FROM state WHERE key = ?", (key,))
+        return json.loads(rows[0]["value"]) if rows else None
+
+    async def set_state(self, key: str, value: dict):
+        if value is None:
+            sql, params = "DELETE FROM state WHERE key = ?", (key,)
+        else:
+            sql = "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+            params = (key, json.dumps(value))
+        await self._run(self._write, lambda conn: conn.execute(sql, params))
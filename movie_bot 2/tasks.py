@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from config import Config
+from database import db
+from helpers import get_movie_info, movie_info_cache, normalize_name
+from jobs import queue, scheduler
+
+logger = logging.getLogger(__name__)
+
+
+@queue.task("cleanup_tokens", max_attempts=3)
+async def cleanup_tokens(payload: dict):
+    """Drop download tokens past TOKEN_EXPIRE_AFTER"""
+    await db.cleanup_tokens()
+
+
+@queue.task("refresh_movie_info", timeout=1800)
+async def refresh_movie_info(payload: dict):
+    """Re-fetch TMDB info for given codes, or for the stalest movies"""
+    codes = payload.get("codes") or await db.stale_movie_codes(payload.get("limit", Config.TMDB_REFRESH_BATCH))
+    refreshed = 0
+    for code in codes:
+        movie = await db.get_movie(code)
+        if not movie:
+            continue
+        # Skip the in-process cache: the point is a fresh answer
+        movie_info_cache.invalidate(normalize_name(movie["title"]))
+        info = await get_movie_info(movie["title"])
+        if info:
+            await db.set_movie_info(code, info)
+            refreshed += 1
+        await asyncio.sleep(0.25)   # stay well inside TMDB's rate limit
+    logger.info(f"TMDB refresh: {refreshed}/{len(codes)} movies")
+    return {"checked": len(codes), "refreshed": refreshed}
+
+
+scheduler.add("cleanup_tokens", "cleanup_tokens", every=Config.TOKEN_CLEANUP_EVERY)
+if Config.TMDB_API_KEY:
+    scheduler.add("refresh_movie_info", "refresh_movie_info", cron=Config.TMDB_REFRESH_CRON, priority=-1)
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from config import Config
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Early flushes in flight; the loop only keeps weak references to tasks
+_flush_tasks = set()
+
+
+class UserRegistry:
+    """Write-behind user registration: drop repeats, batch new users"""
+
+    def __init__(self, flush_interval: float = 5, max_buffer: int = 1000):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.seen = {}          # user_id -> last known username
+        self.buffer = {}        # user_id -> username waiting to be written
+        self.task = None
+        self._flush_lock = asyncio.Lock()
+        self.skipped = 0
+        self.buffered = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def add(self, user_id: int, username: str = None):
+        """Register a user; repeats with the same username cost nothing"""
+        if user_id in self.seen and self.seen[user_id] == username:
+            self.skipped += 1
+            return
+        self.seen[user_id] = username
+        self.buffer[user_id] = username
+        self.buffered += 1
+        if len(self.buffer) >= self.max_buffer:
+            task = asyncio.get_running_loop().create_task(self.flush())
+            _flush_tasks.add(task)
+            task.add_done_callback(_flush_tasks.discard)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self.buffer:
+                return
+            batch, self.buffer = self.buffer, {}
+            try:
+                await db.bulk_upsert_users(batch)
+                self.flushed += len(batch)
+                self.flushes += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"User flush error ({len(batch)} users): {e}")
+                # Keep newer entries, retry the rest next time
+                for user_id, username in batch.items():
+                    self.buffer.setdefault(user_id, username)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "known": len(self.seen),
+            "pending": len(self.buffer),
+            "skipped": self.skipped,
+            "buffered": self.buffered,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "errors": self.errors
+        }
+
+
+# Global instance
+user_registry = UserRegistry(
+    flush_interval=Config.USER_FLUSH_INTERVAL,
+    max_buffer=Config.USER_FLUSH_MAX
+)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Movie Bot - background job worker
+Run: python -m worker  (with JOBS_IN_PROCESS=false for the bot)
+"""
+import asyncio
+import logging
+import signal
+
+from database import db
+from http_client import http_client
+from jobs import queue, scheduler
+import tasks  # noqa: F401  (registers tasks and schedules)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    try:
+        await db.setup()
+        queue.start()
+        scheduler.start()
+        logger.info(f"✅ Worker {queue.worker_id} running {sorted(queue.tasks)}")
+        await stop.wait()
+    finally:
+        await scheduler.stop()
+        await queue.stop()
+        await db.close()
+        await http_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())